@@ -1,3 +1,14 @@
+import os
+import OpenGL
+
+# PyOpenGL calls glGetError (and logs) after every GL call by default, adding overhead to every call in the render loop.
+# Turning this off affects all PyOpenGL code in the process, so it is opt-in: set the environment variable
+# PYGLVIEWER_GL_ERROR_CHECKING=0 before importing pyglviewer (see the README).
+# These flags are read when OpenGL.GL is first imported, so they must be set before any module below imports it.
+if os.environ.get('PYGLVIEWER_GL_ERROR_CHECKING', '1') == '0':
+    OpenGL.ERROR_CHECKING = False
+    OpenGL.ERROR_LOGGING = False
+
 from .core.application import Application
 from .core.application_ui import render_core_ui
 from .core.camera import ThirdPersonCamera
@@ -14,7 +25,7 @@ from .renderer.renderer import Renderer
 from .renderer.shader import PointShape
 from .utils.config import Config
 from .utils.timer import Timer
-from .utils.transform import Transform
+from .utils.transform import Transform, TransformPool
 from .utils.colour import Colour
 
 __version__ = "0.1.0"
@@ -39,6 +50,7 @@ __all__ = [
     "Config",
     "Timer",
     "Transform",
+    "TransformPool",
     "Colour",
 ]
 
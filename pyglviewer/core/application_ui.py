@@ -44,9 +44,7 @@ def render_ui_selection_widget(renderer):
                             imgui.text(f"Draw Type: {shape.draw_type}")
                             
                             # Display vertex count
-                            if shape.vertex_data is not None:
-                                vertex_count = len(shape.vertex_data) // 3  # Assuming 3 components per vertex
-                                imgui.text(f"Vertex Count: {vertex_count}")
+                            imgui.text(f"Vertex Count: {shape.vertex_count}")
                         imgui.tree_pop()
                     # Display transform info
                     if imgui.tree_node("Transform"):
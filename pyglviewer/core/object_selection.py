@@ -53,20 +53,14 @@ class ObjectSelection:
         if self.mouse.left_click:  # Left mouse click
             # Clear previous selection if not holding shift
             if not self.mouse.shift_down:
-                for buffer in [self.renderer.static_buffer, self.renderer.dynamic_buffer]:
-                    for obj in buffer.objects.values():
-                        obj.deselect()
-                for obj in self.renderer.imgui_render_buffer.text_objects.values():
-                    obj.deselect()
-                for obj in self.renderer.imgui_render_buffer.image_objects.values():
-                    obj.deselect()
+                self.renderer.deselect_all()
                     
             # Get Object under cursor
             closest_obj = self.get_object_under_cursor()       
             
             # Select the picked object
             if closest_obj['object']:
-                closest_obj['object'].toggle_select()
+                self.renderer.select_object(closest_obj)
                 # Call callback with object
                 if self.settings.select_callback:
                     self.settings.select_callback(closest_obj)
@@ -0,0 +1,62 @@
+"""
+Optional Numba kernels for transforming large shapes.
+Numba is an optional dependency (pip install pyglviewer[accelerated]), if it is not installed
+NUMBA_AVAILABLE is False and callers should fall back to NumPy.
+"""
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+NUMBA_AVAILABLE = numba is not None
+
+# Shapes with fewer vertices than this are transformed with NumPy (the kernel's call overhead isn't worth it)
+MIN_VERTICES = 256
+# Shapes with at least this many vertices are split across threads (below it, starting the threads costs more than it saves)
+MIN_PARALLEL_VERTICES = 100_000
+
+
+if NUMBA_AVAILABLE:
+    @numba.njit(cache=True, fastmath=True)
+    def _transform_vertex(i, positions, normals, matrix, translation, normal_matrix, out_positions, out_normals):
+        """Transform vertex i, see apply_trs()."""
+        x, y, z = positions[i, 0], positions[i, 1], positions[i, 2]
+        out_positions[i, 0] = matrix[0, 0] * x + matrix[0, 1] * y + matrix[0, 2] * z + translation[0]
+        out_positions[i, 1] = matrix[1, 0] * x + matrix[1, 1] * y + matrix[1, 2] * z + translation[1]
+        out_positions[i, 2] = matrix[2, 0] * x + matrix[2, 1] * y + matrix[2, 2] * z + translation[2]
+
+        x, y, z = normals[i, 0], normals[i, 1], normals[i, 2]
+        nx = normal_matrix[0, 0] * x + normal_matrix[0, 1] * y + normal_matrix[0, 2] * z
+        ny = normal_matrix[1, 0] * x + normal_matrix[1, 1] * y + normal_matrix[1, 2] * z
+        nz = normal_matrix[2, 0] * x + normal_matrix[2, 1] * y + normal_matrix[2, 2] * z
+        norm = np.sqrt(nx * nx + ny * ny + nz * nz)
+        if norm > 0:
+            nx, ny, nz = nx / norm, ny / norm, nz / norm
+        out_normals[i, 0], out_normals[i, 1], out_normals[i, 2] = nx, ny, nz
+
+    @numba.njit(cache=True, fastmath=True)
+    def apply_trs(positions, normals, matrix, translation, normal_matrix, out_positions, out_normals):
+        """Transform (N, 3) positions and normals into the output arrays.
+
+        Args:
+            positions (np.ndarray): (N, 3) float32 positions
+            normals (np.ndarray): (N, 3) float32 normals
+            matrix (np.ndarray): (3, 3) rotation * scale matrix
+            translation (np.ndarray): (3,) translation
+            normal_matrix (np.ndarray): (3, 3) inverse transpose of matrix, used for the normals
+            out_positions (np.ndarray): (N, 3) float32 output positions
+            out_normals (np.ndarray): (N, 3) float32 output normals (renormalised)
+        """
+        for i in range(positions.shape[0]):
+            _transform_vertex(i, positions, normals, matrix, translation, normal_matrix, out_positions, out_normals)
+
+    @numba.njit(cache=True, fastmath=True, parallel=True)
+    def apply_trs_parallel(positions, normals, matrix, translation, normal_matrix, out_positions, out_normals):
+        """apply_trs() split across threads, for very large shapes (see MIN_PARALLEL_VERTICES)."""
+        for i in numba.prange(positions.shape[0]):
+            _transform_vertex(i, positions, normals, matrix, translation, normal_matrix, out_positions, out_normals)
+else:
+    apply_trs = None
+    apply_trs_parallel = None
@@ -0,0 +1,120 @@
+from typing import List, Optional
+import ctypes
+import numpy as np
+from OpenGL.GL import *
+from pyglviewer.renderer.objects import VertexBuffer, IndexBuffer, VertexArray, TextureBuffer
+from pyglviewer.renderer.shapes import Shape, Vertex
+from pyglviewer.renderer.shader import Shader, DefaultShaders
+from pyglviewer.renderer.gl_state import GLState
+from pyglviewer.utils.transform import Transform, world_matrices
+
+
+class BatchBuffer:
+    """Buffer to render many different shapes, each with its own transform and colour, with one draw call.
+
+    The shapes are merged into one vertex / index buffer, and each vertex also stores the index of its shape.
+    The vertex shader uses that index to read the shape's model matrix, normal matrix and colour from a texture
+    buffer (see vertex_shader_lighting_batched), so moving the shapes only uploads their matrices.
+    Use InstanceBuffer instead when the shapes are all the same.
+    """
+
+    # Per shape: 4x4 model matrix (column-major) + 3x3 normal matrix (column-major, padded to vec4s) + rgb colour (padded)
+    SHAPE_FLOATS = 8 * 4
+
+    def __init__(self, shapes: List[Shape], gl_state: Optional[GLState] = None):
+        if len(shapes) == 0:
+            raise ValueError('A batch needs at least one shape')
+        if shapes[0].draw_type == GL_POINTS:
+            raise ValueError('Batching is not supported for point shapes')
+        shape = Shape.concat(shapes)  # Raises if the draw types differ
+        self.draw_type = shape.draw_type
+        self.index_count = shape.index_count
+        self.shape_count = len(shapes)
+        self.shader = DefaultShaders.default_batched_shader
+        self.gl_state = gl_state if gl_state is not None else GLState()
+        self.line_width = 1.0
+        self.alpha = 1.0
+        self.draw_calls = 0
+
+        # Upload the merged shapes once
+        self.vao = VertexArray()
+        # Upload the packed vertices as raw bytes (PyOpenGL doesn't accept structured arrays)
+        vertex_data = shape.interleave().view(np.uint8)
+        index_data = shape.indices.astype(np.uint32, copy=False)
+        shape_indices = np.repeat(np.arange(self.shape_count, dtype=np.float32), [s.vertex_count for s in shapes])
+        self.vertex_buffer = VertexBuffer(vertex_data, GL_STATIC_DRAW, vertex_data.nbytes)
+        self.index_buffer = IndexBuffer(index_data, GL_STATIC_DRAW, index_data.nbytes)
+        self.shape_index_buffer = VertexBuffer(shape_indices, GL_STATIC_DRAW, shape_indices.nbytes)
+        self.vao.add_buffer(self.vertex_buffer, Vertex.layout(), self.index_buffer)
+        self.vao.add_buffer(self.shape_index_buffer, [{'index': 3, 'size': 1, 'type': GL_FLOAT, 'normalized': False, 'stride': 0, 'offset': 0}])
+        # Per-shape data, read by the shader with texelFetch()
+        self.shape_data = np.zeros((self.shape_count, self.SHAPE_FLOATS), dtype=np.float32)
+        self.shape_buffer = TextureBuffer(self.shape_data.nbytes)
+        self.set_transforms(np.tile(np.identity(4, dtype=np.float32), (self.shape_count, 1, 1)))
+
+    def set_transforms(self, transforms: List[Transform] | np.ndarray, colours=None):
+        """Set the transform (and colour) of each shape.
+
+        Parameters
+        ----------
+        transforms : list[Transform] or np.ndarray
+            Transform of each shape (including its parents), or a (N, 4, 4) array of transform matrices (as returned by Transform.world_matrix())
+        colours : np.ndarray, optional
+            (N, 3) rgb colour of each shape, or a single colour for all shapes.
+            Multiplies the shape's vertex colours (default: white, i.e. the shape's own colours)
+        """
+        if isinstance(transforms, np.ndarray):
+            matrices = transforms.reshape(-1, 4, 4).astype(np.float32, copy=False)
+        else:
+            matrices = world_matrices(transforms)
+        if len(matrices) != self.shape_count:
+            raise ValueError(f'Expected {self.shape_count} transforms (one per shape), got {len(matrices)}')
+
+        data = self.shape_data
+        # Matrices are read a column at a time, so store them column-major
+        data[:, 0:16] = matrices.transpose(0, 2, 1).reshape(-1, 16)
+        # Normal matrices are calculated here for all shapes at once, rather than per vertex in the shader
+        data.reshape(-1, 8, 4)[:, 4:7, :3] = Shader.normal_matrix(matrices.transpose(0, 2, 1))
+        data[:, 28:31] = (1.0, 1.0, 1.0) if colours is None else colours
+        self.shape_buffer.update_data(data)
+
+    def render_buffer(self, view_matrix: np.ndarray, projection_matrix: np.ndarray, camera_pos: np.ndarray, lights: Optional[List] = None):
+        """Render all shapes with a single draw call."""
+        self.vao.bind()
+        try:
+            shader = self.shader
+            shader.use()
+            shader.set_camera(view_matrix, projection_matrix, camera_pos)
+            if lights:
+                shader.set_light_uniforms(lights)
+            self.shape_buffer.bind_texture(0)
+            shader.set_uniform('shapeData', 0)
+            shader.set_colour(None)
+            shader.set_alpha(self.alpha)
+            if self.draw_type in (GL_LINES, GL_LINE_STRIP, GL_LINE_LOOP):
+                self.gl_state.set_line_width(self.line_width)
+
+            glDrawElements(self.draw_type, self.index_count, GL_UNSIGNED_INT, ctypes.c_void_p(0))
+            self.draw_calls = 1
+        finally:
+            # Cleanup state
+            self.vao.unbind()
+            glBindTexture(GL_TEXTURE_BUFFER, 0)
+            glUseProgram(0)
+
+    def shutdown(self):
+        """Clean up buffers."""
+        self.shape_buffer.shutdown()
+        self.shape_index_buffer.shutdown()
+        self.vertex_buffer.shutdown()
+        self.index_buffer.shutdown()
+        self.vao.shutdown()
+
+    def get_stats(self):
+        """Get key rendering statistics."""
+        return {
+            'draw_calls': self.draw_calls,
+            'shapes': self.shape_count,
+            'vertices': self.vertex_buffer.size // Vertex.vertex_size(),
+        }
+
@@ -0,0 +1,70 @@
+from OpenGL.GL import *
+
+
+class GLState:
+    """Cache of OpenGL state toggles, so a call is only sent to the driver when the value actually changes.
+
+    All state changes made by the renderer should go through this class. If anything else changes
+    these states directly (e.g. a custom render pass), call invalidate() so the next setter re-issues its call.
+    """
+    def __init__(self):
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget all cached values, forcing the next call to each setter to reach OpenGL."""
+        self._depth_test = None
+        self._cull_face = None
+        self._cull_face_mode = None
+        self._blend = None
+        self._blend_func = None
+        self._polygon_mode = None
+        self._line_width = None
+        self._point_size = None
+
+    def _set_capability(self, capability, enabled):
+        if enabled:
+            glEnable(capability)
+        else:
+            glDisable(capability)
+
+    def set_depth_test(self, enabled: bool):
+        """Enable / disable depth testing."""
+        if self._depth_test != enabled:
+            self._set_capability(GL_DEPTH_TEST, enabled)
+            self._depth_test = enabled
+
+    def set_cull_face(self, enabled: bool, face=GL_BACK):
+        """Enable / disable face culling and set which face is culled."""
+        if self._cull_face != enabled:
+            self._set_capability(GL_CULL_FACE, enabled)
+            self._cull_face = enabled
+        if enabled and self._cull_face_mode != face:
+            glCullFace(face)
+            self._cull_face_mode = face
+
+    def set_blend(self, enabled: bool, src=GL_SRC_ALPHA, dst=GL_ONE_MINUS_SRC_ALPHA):
+        """Enable / disable blending and set the blend function."""
+        if self._blend != enabled:
+            self._set_capability(GL_BLEND, enabled)
+            self._blend = enabled
+        if enabled and self._blend_func != (src, dst):
+            glBlendFunc(src, dst)
+            self._blend_func = (src, dst)
+
+    def set_polygon_mode(self, face, mode):
+        """Set the polygon rasterisation mode (e.g. GL_FILL, GL_LINE)."""
+        if self._polygon_mode != (face, mode):
+            glPolygonMode(face, mode)
+            self._polygon_mode = (face, mode)
+
+    def set_line_width(self, width: float):
+        """Set the rasterised width of lines."""
+        if self._line_width != width:
+            glLineWidth(width)
+            self._line_width = width
+
+    def set_point_size(self, size: float):
+        """Set the rasterised diameter of points."""
+        if self._point_size != size:
+            glPointSize(size)
+            self._point_size = size
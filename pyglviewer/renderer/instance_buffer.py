@@ -0,0 +1,135 @@
+from typing import List, Optional
+import ctypes
+import numpy as np
+from OpenGL.GL import *
+from pyglviewer.renderer.objects import VertexBuffer, IndexBuffer, VertexArray
+from pyglviewer.renderer.shapes import Shape, Vertex
+from pyglviewer.renderer.shader import Shader, DefaultShaders
+from pyglviewer.renderer.gl_state import GLState
+from pyglviewer.utils.transform import Transform, world_matrices
+
+
+class InstanceBuffer:
+    """Buffer to render many copies (instances) of a single shape with one draw call.
+
+    The shape's vertices and indices are uploaded once, each instance only adds a model matrix and a colour,
+    which are stored in a separate per-instance vertex buffer (see vertex_shader_lighting_instanced).
+    """
+
+    # Per instance: 4x4 model matrix (column-major) + rgb colour + 3x3 normal matrix (column-major)
+    INSTANCE_FLOATS = 16 + 3 + 9
+
+    def __init__(self, shape: Shape, max_instances=64, gl_state: Optional[GLState] = None):
+        if shape.draw_type == GL_POINTS:
+            raise ValueError('Instancing is not supported for point shapes')
+        self.draw_type = shape.draw_type
+        self.index_count = shape.index_count
+        self.shader = DefaultShaders.default_instanced_shader
+        self.gl_state = gl_state if gl_state is not None else GLState()
+        self.max_instances = max_instances
+        self.instance_count = 0
+        self.line_width = 1.0
+        self.alpha = 1.0
+        self.draw_calls = 0
+
+        # Upload the shape once
+        self.vao = VertexArray()
+        # Upload the packed vertices as raw bytes (PyOpenGL doesn't accept structured arrays)
+        vertex_data = shape.interleave().view(np.uint8)
+        index_data = shape.indices.astype(np.uint32, copy=False)
+        self.vertex_buffer = VertexBuffer(vertex_data, GL_STATIC_DRAW, vertex_data.nbytes)
+        self.index_buffer = IndexBuffer(index_data, GL_STATIC_DRAW, index_data.nbytes)
+        self.vao.add_buffer(self.vertex_buffer, Vertex.layout(), self.index_buffer)
+        # Per-instance data
+        self.instance_buffer = self._create_instance_buffer()
+
+    @staticmethod
+    def instance_layout():
+        """Get the per-instance attribute layout: a mat4 (as 4 vec4 columns, locations 3-6), a colour (location 7)
+        and a mat3 normal matrix (as 3 vec3 columns, locations 8-10)."""
+        float_size = np.dtype(np.float32).itemsize
+        stride = InstanceBuffer.INSTANCE_FLOATS * float_size
+        layout = [{'index': 3 + column, 'size': 4, 'type': GL_FLOAT, 'normalized': False, 'stride': stride, 'offset': column * 4 * float_size, 'divisor': 1} for column in range(4)]
+        layout.append({'index': 7, 'size': 3, 'type': GL_FLOAT, 'normalized': False, 'stride': stride, 'offset': 16 * float_size, 'divisor': 1})
+        layout += [{'index': 8 + column, 'size': 3, 'type': GL_FLOAT, 'normalized': False, 'stride': stride, 'offset': (19 + column * 3) * float_size, 'divisor': 1} for column in range(3)]
+        return layout
+
+    def _create_instance_buffer(self):
+        """Create the per-instance buffer with the current max size and attach it to the VAO."""
+        instance_buffer = VertexBuffer(None, GL_DYNAMIC_DRAW, self.max_instances * self.INSTANCE_FLOATS * np.dtype(np.float32).itemsize)
+        self.vao.add_buffer(instance_buffer, self.instance_layout())
+        return instance_buffer
+
+    def set_instances(self, transforms: List[Transform] | np.ndarray, colours=None):
+        """Set the instances to render.
+
+        Parameters
+        ----------
+        transforms : list[Transform] or np.ndarray
+            Transform of each instance (including its parents), or a (N, 4, 4) array of transform matrices (as returned by Transform.world_matrix())
+        colours : np.ndarray, optional
+            (N, 3) rgb colour of each instance, or a single colour for all instances.
+            Multiplies the shape's vertex colours (default: white, i.e. the shape's own colours)
+        """
+        if isinstance(transforms, np.ndarray):
+            matrices = transforms.reshape(-1, 4, 4)
+        else:
+            matrices = world_matrices(transforms)
+        count = len(matrices)
+
+        instance_data = np.empty((count, self.INSTANCE_FLOATS), dtype=np.float32)
+        # mat4 attributes are read a column at a time, so store each matrix column-major
+        instance_data[:, :16] = matrices.transpose(0, 2, 1).reshape(count, 16)
+        instance_data[:, 16:19] = (1.0, 1.0, 1.0) if colours is None else colours
+        # Normal matrices are calculated once per instance here rather than per vertex in the shader
+        instance_data[:, 19:] = Shader.normal_matrix(matrices.transpose(0, 2, 1)).reshape(count, 9)
+
+        # Grow the instance buffer if needed
+        if count > self.max_instances:
+            self.max_instances = max(count, int(self.max_instances * 1.5))
+            self.instance_buffer.shutdown()
+            self.instance_buffer = self._create_instance_buffer()
+        if count > 0:
+            self.instance_buffer.update_data(instance_data)
+        self.instance_count = count
+
+    def render_buffer(self, view_matrix: np.ndarray, projection_matrix: np.ndarray, camera_pos: np.ndarray, lights: Optional[List] = None):
+        """Render all instances with a single draw call."""
+        self.draw_calls = 0
+        if self.instance_count == 0:
+            return
+
+        self.vao.bind()
+        try:
+            shader = self.shader
+            shader.use()
+            shader.set_camera(view_matrix, projection_matrix, camera_pos)
+            if lights:
+                shader.set_light_uniforms(lights)
+            shader.set_colour(None)
+            shader.set_alpha(self.alpha)
+            shader.set_model_matrix(np.identity(4, dtype=np.float32))
+            if self.draw_type in (GL_LINES, GL_LINE_STRIP, GL_LINE_LOOP):
+                self.gl_state.set_line_width(self.line_width)
+
+            glDrawElementsInstanced(self.draw_type, self.index_count, GL_UNSIGNED_INT, ctypes.c_void_p(0), self.instance_count)
+            self.draw_calls = 1
+        finally:
+            # Cleanup state
+            self.vao.unbind()
+            glUseProgram(0)
+
+    def shutdown(self):
+        """Clean up buffers."""
+        self.instance_buffer.shutdown()
+        self.vertex_buffer.shutdown()
+        self.index_buffer.shutdown()
+        self.vao.shutdown()
+
+    def get_stats(self):
+        """Get key rendering statistics."""
+        return {
+            'draw_calls': self.draw_calls,
+            'instances': f"{self.instance_count}/{self.max_instances}",
+            'vertices_per_instance': self.vertex_buffer.size // Vertex.vertex_size(),
+        }
@@ -6,17 +6,51 @@ from pyglviewer.utils.transform import Transform
 from pyglviewer.renderer.shader import Shader, PointShape
 from pyglviewer.renderer.shapes import Shape
 from dataclasses import dataclass
+from functools import lru_cache
+from OpenGL.GL.ARB.buffer_storage import glInitBufferStorageARB
+
+
+# Number of copies (regions) of each persistently mapped buffer. Each frame draws from one region while the
+# next is written, so writes only wait for the GPU if it is this many frames behind (see Buffer.fence())
+PERSISTENT_REGIONS = 3
+
+
+@lru_cache(maxsize=None)
+def buffer_storage_supported():
+    """Whether buffers can be persistently mapped (OpenGL 4.4 or ARB_buffer_storage), needs a current context."""
+    return bool(glInitBufferStorageARB())
+
 
 class Buffer:
-    """Base class for OpenGL buffer objects. Set size when using a dynamic / stream buffer."""
-    def __init__(self, data, buffer_type, target, size):
+    """Base class for OpenGL buffer objects. Set size when using a dynamic / stream buffer.
+    
+    Persistent buffers (if supported) are mapped once when created and written directly. They hold PERSISTENT_REGIONS
+    copies of the data (each of size bytes), used in turn: draws read the region at region_offset, and fence() moves
+    on to the next region once they have been issued, see update_data() and fence()."""
+    def __init__(self, data, buffer_type, target, size, persistent=False):
         self.id = glGenBuffers(1)
         self.target = target
         self.buffer_type = buffer_type
         self.size = size
         self.deleted = False  # Track if buffer has been deleted
+        self.mapping = None   # Address of the persistent mapping
+        self.region = 0          # Region written and drawn from this frame (always 0 if not persistent)
+        self.region_offset = 0   # Byte offset of that region
+        self._fences = []        # Per region, signalled once the GPU has finished the draws reading it (see fence())
+        self._pending = []       # Per region, writes made to other regions that it doesn't have yet
+        self._region_ready = True
         self.bind()
-        glBufferData(self.target, self.size, data, buffer_type)
+        if persistent and self.size > 0 and buffer_storage_supported():
+            # Immutable storage, mapped for the lifetime of the buffer. Coherent, so writes are seen by the GPU without flushing
+            flags = GL_MAP_WRITE_BIT | GL_MAP_PERSISTENT_BIT | GL_MAP_COHERENT_BIT
+            glBufferStorage(self.target, self.size * PERSISTENT_REGIONS, None, flags | GL_DYNAMIC_STORAGE_BIT)
+            self.mapping = glMapBufferRange(self.target, 0, self.size * PERSISTENT_REGIONS, flags)
+            self._fences = [None] * PERSISTENT_REGIONS
+            self._pending = [[] for _ in range(PERSISTENT_REGIONS)]
+            if data is not None:
+                self.update_data(np.asarray(data))
+        else:
+            glBufferData(self.target, self.size, data, buffer_type)
 
     def bind(self):
         """Bind this buffer to its target."""
@@ -27,7 +61,10 @@ class Buffer:
         glBindBuffer(self.target, 0)
 
     def update_data(self, data, offset=0):
-        """Update the buffer's data. Reallocates if data is larger than current size."""
+        """Update the buffer's data. Reallocates if data is larger than current size.
+        Dynamic / stream buffers are written through glMapBufferRange with GL_MAP_INVALIDATE_RANGE_BIT,
+        which tells the driver the old contents of the range are not needed, so it doesn't have to wait
+        for draws from the previous frame that still read it (as glBufferSubData may)."""
         data_size = data.nbytes
         
         # If new data is larger than current buffer, reallocate
@@ -48,13 +85,103 @@ class Buffer:
             # #         self.index_count * np.dtype(np.uint32).itemsize
             # #     )
                 
+        if self.mapping:
+            # Persistently mapped: write the current region directly, the other regions are brought up to date when
+            # they are next used, so this doesn't wait for draws still reading them
+            self.prepare_region()
+            data = np.ascontiguousarray(data)
+            ctypes.memmove(self.mapping + self.region_offset + offset, data.ctypes.data, data_size)
+            data_bytes = data.tobytes()
+            end = offset + data_size
+            for region, pending in enumerate(self._pending):
+                if region != self.region:
+                    # Drop earlier writes this one covers, so repeatedly updating the same data doesn't build up
+                    pending[:] = [write for write in pending if write[0] < offset or write[0] + len(write[1]) > end]
+                    pending.append((offset, data_bytes))
+            return
         self.bind()
-        glBufferSubData(self.target, offset, data_size, data)
+        if self.buffer_type == GL_STATIC_DRAW or data_size == 0:
+            glBufferSubData(self.target, offset, data_size, data)
+            return
+        pointer = glMapBufferRange(self.target, offset, data_size, GL_MAP_WRITE_BIT | GL_MAP_INVALIDATE_RANGE_BIT)
+        if not pointer:
+            # Mapping failed, fall back to a plain upload
+            glBufferSubData(self.target, offset, data_size, data)
+            return
+        try:
+            ctypes.memmove(pointer, np.ascontiguousarray(data).ctypes.data, data_size)
+        finally:
+            glUnmapBuffer(self.target)
+
+    def prepare_region(self):
+        """Bring the current region of a persistently mapped buffer up to date, call before drawing from it.
+
+        Waits for the draws which last read the region (PERSISTENT_REGIONS frames ago) to complete, then copies in
+        the writes made to the other regions since. Does nothing if it is already up to date, or not persistent."""
+        if self._region_ready:
+            return
+        fence = self._fences[self.region]
+        if fence is not None:
+            while glClientWaitSync(fence, GL_SYNC_FLUSH_COMMANDS_BIT, 1_000_000_000) == GL_TIMEOUT_EXPIRED:
+                pass
+            glDeleteSync(fence)
+            self._fences[self.region] = None
+        for offset, data_bytes in self._pending[self.region]:
+            ctypes.memmove(self.mapping + self.region_offset + offset, data_bytes, len(data_bytes))
+        self._pending[self.region] = []
+        self._region_ready = True
+
+    def fence(self):
+        """Mark the end of the commands which read the buffer (call after drawing from it).
+        A persistently mapped buffer then moves on to its next region, and writes to this region wait for these
+        commands (see prepare_region()), so they don't change data still in use."""
+        if not self.mapping:
+            return
+        if self._fences[self.region] is not None:
+            glDeleteSync(self._fences[self.region])
+        self._fences[self.region] = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+        self.region = (self.region + 1) % PERSISTENT_REGIONS
+        self.region_offset = self.region * self.size
+        self._region_ready = False
+
+    def copy_from(self, source, size):
+        """Copy the first size bytes of another buffer's (current) data into this buffer, on the GPU.
+
+        Parameters
+        ----------
+        source : Buffer
+            Buffer to copy from
+        size : int
+            Number of bytes to copy
+        """
+        source.prepare_region()
+        glBindBuffer(GL_COPY_READ_BUFFER, source.id)
+        glBindBuffer(GL_COPY_WRITE_BUFFER, self.id)
+        regions = range(PERSISTENT_REGIONS) if self.mapping else (0,)
+        for region in regions:
+            glCopyBufferSubData(GL_COPY_READ_BUFFER, GL_COPY_WRITE_BUFFER, source.region_offset, region * self.size, size)
+        glBindBuffer(GL_COPY_READ_BUFFER, 0)
+        glBindBuffer(GL_COPY_WRITE_BUFFER, 0)
+        if self.mapping:
+            # Writes through the mapping must wait for the copies
+            for region in regions:
+                if self._fences[region] is not None:
+                    glDeleteSync(self._fences[region])
+                self._fences[region] = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+            # Every region now holds the copied data, so earlier writes must not be replayed over it (only the parts
+            # beyond the copied bytes are kept)
+            self._pending = [[(max(offset, size), data_bytes[max(size - offset, 0):]) for offset, data_bytes in pending if offset + len(data_bytes) > size]
+                             for pending in self._pending]
+            self._region_ready = False
 
     def shutdown(self):
         """Clean up buffer."""
         if hasattr(self, 'id') and not self.deleted:
             try:
+                for fence in self._fences:
+                    if fence is not None:
+                        glDeleteSync(fence)
+                self._fences = []
                 glDeleteBuffers(1, [self.id])
                 self.deleted = True
                 self.id = None
@@ -70,13 +197,13 @@ class Buffer:
 
 class VertexBuffer(Buffer):
     """Vertex buffer object for storing vertex data."""
-    def __init__(self, data, buffer_type, size):
-        super().__init__(data, buffer_type, GL_ARRAY_BUFFER, size)
+    def __init__(self, data, buffer_type, size, persistent=False):
+        super().__init__(data, buffer_type, GL_ARRAY_BUFFER, size, persistent)
 
 class IndexBuffer(Buffer):
     """Index buffer object for storing index data."""
-    def __init__(self, data, buffer_type, size):
-        super().__init__(data, buffer_type, GL_ELEMENT_ARRAY_BUFFER, size)
+    def __init__(self, data, buffer_type, size, persistent=False):
+        super().__init__(data, buffer_type, GL_ELEMENT_ARRAY_BUFFER, size, persistent)
         self.count = len(data) if data is not None else 0
 
     def update_data(self, data, offset=0):
@@ -84,6 +211,38 @@ class IndexBuffer(Buffer):
         self.count = len(data) if data is not None else 0
         super().update_data(data, offset)
 
+class UniformBuffer(Buffer):
+    """Uniform buffer object, holds a uniform block shared by every shader bound to the same binding point."""
+    def __init__(self, size, binding, buffer_type=GL_DYNAMIC_DRAW):
+        super().__init__(None, buffer_type, GL_UNIFORM_BUFFER, size)
+        self.binding = binding
+        glBindBufferBase(GL_UNIFORM_BUFFER, binding, self.id)
+
+class TextureBuffer(Buffer):
+    """Texture buffer object, a buffer which shaders read as an array of texels (samplerBuffer / texelFetch())."""
+    def __init__(self, size, buffer_type=GL_DYNAMIC_DRAW, internal_format=GL_RGBA32F):
+        super().__init__(None, buffer_type, GL_TEXTURE_BUFFER, size)
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_BUFFER, self.texture)
+        glTexBuffer(GL_TEXTURE_BUFFER, internal_format, self.id)
+        glBindTexture(GL_TEXTURE_BUFFER, 0)
+
+    def bind_texture(self, unit=0):
+        """Bind the buffer's texture to a texture unit."""
+        glActiveTexture(GL_TEXTURE0 + unit)
+        glBindTexture(GL_TEXTURE_BUFFER, self.texture)
+
+    def shutdown(self):
+        """Clean up texture and buffer."""
+        if getattr(self, 'texture', None) is not None:
+            try:
+                glDeleteTextures(1, [self.texture])
+                self.texture = None
+            except Exception:
+                # Context might be destroyed, ignore errors
+                pass
+        super().shutdown()
+
 class VertexArray:
     """Vertex array object for managing vertex attribute configurations."""
     def __init__(self):
@@ -98,10 +257,13 @@ class VertexArray:
         """Unbind this vertex array object."""
         glBindVertexArray(0)
 
-    def add_buffer(self, vb, layout):
-        """Add a vertex buffer with specified attribute layout to this VAO."""
+    def add_buffer(self, vb, layout, ib=None):
+        """Add a vertex buffer with specified attribute layout to this VAO.
+        If an index buffer is given, it is also recorded in the VAO so only the VAO needs binding at draw time."""
         self.bind()
         vb.bind()
+        if ib is not None:
+            ib.bind()
         for attribute in layout:
             glEnableVertexAttribArray(attribute['index'])
             glVertexAttribPointer(
@@ -112,6 +274,11 @@ class VertexArray:
                 attribute['stride'],
                 ctypes.c_void_p(attribute['offset'])
             )
+            # Per-instance attributes advance once every `divisor` instances rather than every vertex
+            if attribute.get('divisor', 0):
+                glVertexAttribDivisor(attribute['index'], attribute['divisor'])
+        # Unbind so later buffer uploads don't overwrite the VAO's index buffer binding
+        self.unbind()
 
     def shutdown(self):
         """Clean up VAO."""
@@ -140,6 +307,7 @@ class Object:
         # Set properties
         self._transform: Transform           = Transform()
         self._model_matrix                   = np.identity(4, dtype=np.float32)
+        self._normal_matrix                  = np.identity(3, dtype=np.float32)
         self._point_size: float              = 1.0
         self._line_width: float              = 1.0
         self._point_shape: PointShape        = PointShape.CIRCLE
@@ -181,13 +349,18 @@ class Object:
     
     def set_transform(self, transform: Transform):
         """Set the 4x4 transformation matrix.
+
+        The transform's world matrix (including its parents) is read when this is called, so call it again after
+        changing the transform or any of its parents.
+
         Parameters
         ----------
         transform : Transform
             Transform object
         """
         self._transform = Transform() if transform is None else transform
-        self._model_matrix = np.identity(4, dtype=np.float32) if transform is None else transform.transform_matrix().T 
+        self._model_matrix = np.identity(4, dtype=np.float32) if transform is None else transform.world_matrix().T.copy()  # Copy, the transform's matrix is updated in place
+        self._normal_matrix = Shader.normal_matrix(self._model_matrix)
         self._bounds_needs_update = True  # Mark bounds for recalculation
     def set_translate(self, translate=(0, 0, 0)):
         """Set the translation component of the object's model matrix.
@@ -198,8 +371,8 @@ class Object:
             Translation vector (x,y,z) (default: (0,0,0))
         """
         self._transform.set_translate(translate[0], translate[1], translate[2])
-        self._model_matrix[3, :3] = translate
-        self._bounds_needs_update = True  # Mark bounds for recalculation
+        # Rebuilt from the world matrix, as the transform's parents and rotation / scale also apply
+        self.set_transform(self._transform)
     def set_point_size(self, point_size):
         self._point_size = point_size
     def set_line_width(self, line_width):
@@ -263,11 +436,13 @@ class Object:
         if not self._bounds_needs_update:
             return self._world_bounds
         
-        # Combine all shape vertices and reshape to Nx3 array of positions and remove colours / normals
-        vertices = np.concatenate([shape_data['shape'].vertex_data for shape_data in self._shape_data]).reshape(-1, 3, 3)[:,0,:]
-        # Get local bounds from actual vertex data
-        local_min = np.min(vertices, axis=0)
-        local_max = np.max(vertices, axis=0)
+        # Combine the cached bounds of each shape rather than concatenating all of their vertex data
+        shape_bounds = [shape_data['shape'].local_bounds() for shape_data in self._shape_data if shape_data['shape'] is not None]
+        shape_bounds = [bounds for bounds in shape_bounds if bounds is not None]
+        if not shape_bounds:
+            return None
+        local_min = np.min([bounds[0] for bounds in shape_bounds], axis=0)
+        local_max = np.max([bounds[1] for bounds in shape_bounds], axis=0)
         
         # Apply transform to bounds
         world_min = (self._model_matrix.T @ np.append(local_min, 1))[:3]
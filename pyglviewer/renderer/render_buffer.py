@@ -4,79 +4,64 @@ import numpy as np
 from OpenGL.GL import *
 from pyglviewer.renderer.objects import VertexBuffer, IndexBuffer, VertexArray, Object
 from pyglviewer.renderer.shapes import Shape, Vertex
+from pyglviewer.renderer.gl_state import GLState
+
+
+# Marks a uniform that hasn't been set on the current shader yet
+_UNSET = object()
 
 
 class RenderBuffer:
     """ Buffer to store and renderer objects in OpenGL"""
     
-    def __init__(self, max_vertices, max_indices, buffer_type):
+    def __init__(self, max_vertices, max_indices, buffer_type, gl_state: Optional[GLState] = None):
         self.max_vertices = max_vertices
         self.max_indices = max_indices
         self.buffer_type = buffer_type
+        self.gl_state = gl_state if gl_state is not None else GLState()
         self.growth_factor = 1.5  # Increase buffer by 50% when needed
-        # Create initial buffers
-        self.vertex_buffer, self.index_buffer, self.vao = self._create_buffers()
+        # Create initial buffers, a single VAO is shared for the lifetime of the buffer as every vertex has the same layout
+        self.vao = VertexArray()
+        self.vertex_buffer, self.index_buffer = self._create_buffers()
         self.objects = {}    
         self.current_vertex = 0
         self.current_index = 0
         self.dangling = {'vertices': [], 'indices': []}
+        # Shapes grouped by (shader, primitive), only rebuilt when objects or their shapes change
+        self._batches = {}
+        self._batches_need_update = True
         # Statistics
         self.draw_calls = 0
         
     def _create_buffers(self):
-        """Create or recreate buffers with current max sizes."""
+        """Create or recreate buffers with current max sizes and attach them to the shared VAO."""
         vertex_size = Vertex.vertex_size()
         index_size = Vertex.index_size()
+        # Buffers updated while rendering are persistently mapped (if supported), see Buffer.update_data()
+        persistent = self.buffer_type != GL_STATIC_DRAW
         
         vertex_buffer = VertexBuffer(
             None,
             self.buffer_type,
-            self.max_vertices * vertex_size
+            self.max_vertices * vertex_size,
+            persistent
         )
         
         index_buffer = IndexBuffer(
             None,
             self.buffer_type,
-            self.max_indices * index_size
+            self.max_indices * index_size,
+            persistent
         )
         
-        # Create VAO with standard layout
-        vao = VertexArray()
-        vao.add_buffer(vertex_buffer, [
-            # Position attribute (location=0)
-            {
-                'index': 0,
-                'size': 3,
-                'type': GL_FLOAT,
-                'normalized': False,
-                'stride': vertex_size,
-                'offset': 0
-            },
-            # Colour attribute (location=1)
-            {
-                'index': 1,
-                'size': 3,
-                'type': GL_FLOAT,
-                'normalized': False,
-                'stride': vertex_size,
-                'offset': 3 * np.dtype(np.float32).itemsize
-            },
-            # Normal attribute (location=2)
-            {
-                'index': 2,
-                'size': 3,
-                'type': GL_FLOAT,
-                'normalized': False,
-                'stride': vertex_size,
-                'offset': 6 * np.dtype(np.float32).itemsize
-            }
-        ])
-        return vertex_buffer, index_buffer, vao
+        # Point the shared VAO at the new buffers (standard layout)
+        self.vao.add_buffer(vertex_buffer, Vertex.layout(), index_buffer)
+        return vertex_buffer, index_buffer
     
     def _resize_buffers(self, new_vertex_count, new_index_count):
         """Resize buffers to accommodate more data."""
         # Store old buffers
-        old_vertex_buffer, old_index_buffer, old_vao = self.vertex_buffer, self.index_buffer, self.vao
+        old_vertex_buffer, old_index_buffer = self.vertex_buffer, self.index_buffer
         old_max_vertices, old_max_indices = self.max_vertices, self.max_indices
         
         # Update sizes
@@ -85,24 +70,15 @@ class RenderBuffer:
         print(f"Resizing buffers: vertices {old_max_vertices}->{new_vertex_count}, indices {old_max_indices}->{new_index_count}")
         try:
             # Create new buffers
-            self.vertex_buffer, self.index_buffer, self.vao = self._create_buffers()
+            self.vertex_buffer, self.index_buffer = self._create_buffers()
             # Copy old contents into new buffer
-            glBindBuffer(GL_COPY_READ_BUFFER, old_vertex_buffer.id)
-            glBindBuffer(GL_COPY_WRITE_BUFFER, self.vertex_buffer.id)
-            glCopyBufferSubData(GL_COPY_READ_BUFFER, GL_COPY_WRITE_BUFFER, 0, 0, min(old_max_vertices, self.max_vertices) * Vertex.vertex_size())
-            # Copy old contents into new buffer
-            glBindBuffer(GL_COPY_READ_BUFFER, old_index_buffer.id)
-            glBindBuffer(GL_COPY_WRITE_BUFFER, self.index_buffer.id)
-            glCopyBufferSubData(GL_COPY_READ_BUFFER, GL_COPY_WRITE_BUFFER, 0, 0, min(old_max_indices, self.max_indices) * Vertex.index_size())
-            # Cleanup: unbind copy targets
-            glBindBuffer(GL_COPY_READ_BUFFER, 0)
-            glBindBuffer(GL_COPY_WRITE_BUFFER, 0)
+            self.vertex_buffer.copy_from(old_vertex_buffer, min(old_max_vertices, self.max_vertices) * Vertex.vertex_size())
+            self.index_buffer.copy_from(old_index_buffer, min(old_max_indices, self.max_indices) * Vertex.index_size())
 
         finally:
             # Clean up old buffers           
             old_vertex_buffer.shutdown()
             old_index_buffer.shutdown()
-            old_vao.shutdown()
     
     def clear(self):
         """Clear the buffer data."""
@@ -112,6 +88,7 @@ class RenderBuffer:
         self.current_vertex = 0
         self.current_index = 0
         self.dangling = {'vertices': [], 'indices': []}
+        self._batches_need_update = True
     
         print(f'Clear() is not properly implemented')
     
@@ -119,18 +96,22 @@ class RenderBuffer:
         if name in self.objects:
             raise ValueError(f"Object '{name}' already exists")
         self.objects[name] = object
+        self._batches_need_update = True
     
     def remove_object(self, name):
         object = self.objects[name]
-        self._clear_object_shapes(object)
+        # Free vertices / indices from the buffer
+        for shape_data in object._shape_data:
+            self._free_segment(shape_data)
         # TOOD: is there anything else to clear before the deleting an object?
         del self.objects[name]
+        self._batches_need_update = True
     
     def _free_segment(self, shape_data):
         '''Make list of redundant vertices and indices we can later reuse'''
         shape = shape_data['shape']
         segment = shape_data['segment']
-        if (shape is None) or (segment is None) or (shape.vertex_data is None) or (shape.indices is None):
+        if (shape is None) or (segment is None) or (shape.positions is None) or (shape.indices is None):
             return
         if segment['vertex_size'] > 0:
             self.dangling['vertices'].append({'offset': segment['vertex_offset'], 'size': segment['vertex_size']})
@@ -138,25 +119,43 @@ class RenderBuffer:
             self.dangling['indices'].append({'offset': segment['index_offset'], 'size': segment['index_size']})
             
         
+    def _reuse_dangling(self, key, count):
+        """Take space for `count` vertices / indices from the smallest redundant block that fits it.
+        Any space left over is kept for later reuse. Returns the offset, or None if no block is large enough."""
+        blocks = [block for block in self.dangling[key] if block['size'] >= count]
+        if count == 0 or not blocks:
+            return None
+        block = min(blocks, key=lambda block: block['size'])
+        self.dangling[key].remove(block)
+        if block['size'] > count:
+            self.dangling[key].append({'offset': block['offset'] + count, 'size': block['size'] - count})
+        return block['offset']
+
     def _allocate_segment(self, vertex_count, index_count):
         """
         Resize the object's shape list to match the provided shapes.
         """
+        # Reuse space freed by removed / resized shapes if possible, otherwise allocate at the end of the buffer
+        vertex_offset = self._reuse_dangling('vertices', vertex_count)
+        index_offset = self._reuse_dangling('indices', index_count)
+        new_vertices = vertex_count if vertex_offset is None else 0
+        new_indices = index_count if index_offset is None else 0
+        
         # Resize buffer if needed (see self.growth_factor)
-        if self.current_vertex + vertex_count > self.max_vertices or self.current_index + index_count > self.max_indices:
-            new_vertex_count = max(self.max_vertices, int(self.current_vertex + vertex_count * self.growth_factor))
-            new_index_count = max(self.max_indices, int(self.current_index + index_count * self.growth_factor))
+        if self.current_vertex + new_vertices > self.max_vertices or self.current_index + new_indices > self.max_indices:
+            new_vertex_count = max(self.max_vertices, int(self.current_vertex + new_vertices * self.growth_factor))
+            new_index_count = max(self.max_indices, int(self.current_index + new_indices * self.growth_factor))
             self._resize_buffers(new_vertex_count, new_index_count)
         
         buffer_segment = {
-            'vertex_offset': self.current_vertex,   # TODO: Reuse self.dangling if possible
-            'index_offset': self.current_index,
+            'vertex_offset': self.current_vertex if vertex_offset is None else vertex_offset,
+            'index_offset': self.current_index if index_offset is None else index_offset,
             'vertex_size': vertex_count,
             'index_size': index_count
         }
         # Update global offsets
-        self.current_vertex += vertex_count
-        self.current_index += index_count
+        self.current_vertex += new_vertices
+        self.current_index += new_indices
         print(f'Allocating segment (current_vertex: {self.current_vertex}, current_index: {self.current_index})')
         return buffer_segment
         
@@ -191,6 +190,8 @@ class RenderBuffer:
             object._shape_data[i]['shape'] = shape
         # Since we are manually modifying the object's shape, we must also set a flag to update the bounds
         object._bounds_needs_update = True
+        # Shapes may have changed shader / primitive
+        self._batches_need_update = True
             
 
     def set_object_shapes(self, name, shapes: Shape | list[Shape]):
@@ -219,36 +220,59 @@ class RenderBuffer:
         
         # Set vertex & index data
         for i, shape in enumerate(shapes):
-            if shape.vertex_data is None or shape.indices is None:
+            if shape.positions is None or shape.indices is None:
                 continue
             vertex_offset, index_offset, vertex_size, index_size = object._shape_data[i]['segment'].values()
-            vertex_data = shape.vertex_data.reshape(-1, 9).astype(np.float32)
-            index_data = (shape.indices + vertex_offset).astype(np.uint32)
+            # Upload the packed vertices as raw bytes (PyOpenGL doesn't accept structured arrays)
+            vertex_data = shape.interleave().view(np.uint8)
+            # Indices are uploaded relative to the shape, the segment's vertex offset is added when drawing (base vertex)
+            index_data = shape.indices.astype(np.uint32, copy=False)
             # Update buffers with new data (using glBufferSubData)
             self.vertex_buffer.update_data(vertex_data, offset=vertex_offset * Vertex.vertex_size())
             self.index_buffer.update_data(index_data, offset=index_offset * Vertex.index_size())
                     
     
+    def _update_batches(self):
+        """Group shapes by (shader, draw_type). Only called when an object or its shapes have changed.
+        Batches are ordered by shader then primitive, and the shapes within a batch by line width, point size, alpha (opaque first)
+        and whether the colour is overridden, so neighbouring draws share as much OpenGL state and as many uniforms
+        as possible (see GLState and render_buffer())."""
+        batches = defaultdict(list)
+        for name, obj in self.objects.items():
+            for shape_data in obj._shape_data:
+                if shape_data['shape'] is None:
+                    continue
+                batch_key = (int(shape_data['shape'].shader.program), int(shape_data['shape'].draw_type))
+                batches[batch_key].append((obj, shape_data))
+        for batch_data in batches.values():
+            batch_data.sort(key=lambda item: (item[0]._line_width, item[0]._point_size, -item[0]._alpha,
+                                              item[0]._colour is not None, item[0]._wireframe_colour is not None))
+        self._batches = dict(sorted(batches.items()))
+        self._batches_need_update = False
+    
     def render_buffer(self, view_matrix: np.ndarray, projection_matrix: np.ndarray, camera_pos: np.ndarray, lights: Optional[List] = None):
         """Render objects from specified buffer."""
+        self.draw_calls = 0
         # Skip if no objects to render
         if not self.objects:
             return
         
-        # Group shapes by (shader, draw_type)
-        batches = defaultdict(list)
-        for name, obj in self.objects.items():
-            for shape_data in obj._shape_data:
-                batch_key = f"Shader:{shape_data['shape'].shader.program}_Primitive:{shape_data['shape'].draw_type}"
-                batches[batch_key].append((obj, shape_data))
+        # Group shapes by (shader, draw_type), reusing the previous grouping if nothing has changed
+        if self._batches_need_update:
+            self._update_batches()
+        batches = self._batches
         
-        # Bind VAO and shader
+        # Bind VAO (vertex & index buffers are recorded in the VAO)
         self.vao.bind()
-        self.vertex_buffer.bind()
-        self.index_buffer.bind()
+        # Persistently mapped buffers draw from their current region (both are 0 otherwise)
+        self.vertex_buffer.prepare_region()
+        self.index_buffer.prepare_region()
+        base_vertex = self.vertex_buffer.region_offset // Vertex.vertex_size()
+        base_index_offset = self.index_buffer.region_offset
         
-        self.draw_calls = 0
         current_shader = None
+        # Uniform values last set on the current shader, draws with the same values don't set them again
+        current_colour = current_alpha = current_point_shape = _UNSET
         
         # Draw each batch
         try:
@@ -268,43 +292,46 @@ class RenderBuffer:
                     # Set up shader if it's different from the current one
                     if shader != current_shader:
                         shader.use()
-                        shader.set_view_matrix(view_matrix)
-                        shader.set_projection_matrix(projection_matrix)
-                        shader.set_view_position(camera_pos)
+                        shader.set_camera(view_matrix, projection_matrix, camera_pos)
                         if lights:
                             shader.set_light_uniforms(lights)
                         current_shader = shader
+                        current_colour = current_alpha = current_point_shape = _UNSET
                     
                     # Draw each object in the batch
-                    if shape.vertex_data is None or shape.indices is None:
+                    if shape.positions is None or shape.indices is None:
                         continue
                 
-                    # Reset the colour flag
-                    current_shader.set_colour(None)
-
                     # Wireframe
                     if primitive in (GL_LINES, GL_LINE_STRIP, GL_LINE_LOOP) :
-                        glLineWidth(object._line_width)
-                        if object._wireframe_colour: # Override colour
-                            current_shader.set_colour(object._wireframe_colour)
+                        self.gl_state.set_line_width(object._line_width)
+                        colour = object._wireframe_colour
                     else:
-                        if object._colour: # Override colour
-                            current_shader.set_colour(object._colour)
+                        colour = object._colour
+                    # Override colour (None uses the vertex colours)
+                    if colour is not current_colour:
+                        current_shader.set_colour(colour)
+                        current_colour = colour
                     # Points
                     if primitive == GL_POINTS:
-                        glPointSize(object._point_size)
-                        current_shader.set_point_shape(object._point_shape)
+                        self.gl_state.set_point_size(object._point_size)
+                        if object._point_shape != current_point_shape:
+                            current_shader.set_point_shape(object._point_shape)
+                            current_point_shape = object._point_shape
 
                     # Set alpha for transparency
-                    current_shader.set_alpha(object._alpha)
+                    if object._alpha != current_alpha:
+                        current_shader.set_alpha(object._alpha)
+                        current_alpha = object._alpha
                     # Set model matrix for this object
-                    current_shader.set_model_matrix(object._model_matrix)
+                    current_shader.set_model_matrix(object._model_matrix, object._normal_matrix)
                     # Draw the object
-                    glDrawElements(
+                    glDrawElementsBaseVertex(
                         primitive,
                         shape.index_count,
                         GL_UNSIGNED_INT,
-                        ctypes.c_void_p(index_offset * Vertex.index_size())  # 4 bytes per uint32
+                        ctypes.c_void_p(base_index_offset + index_offset * Vertex.index_size()),  # 4 bytes per uint32
+                        base_vertex + vertex_offset
                     )
                     # Count the draw calls
                     self.draw_calls += 1
@@ -312,9 +339,10 @@ class RenderBuffer:
         finally:
             # Cleanup state
             self.vao.unbind()
-            self.vertex_buffer.unbind()
-            self.index_buffer.unbind()
             glUseProgram(0)
+            # Later updates to the buffers must wait for these draws
+            self.vertex_buffer.fence()
+            self.index_buffer.fence()
         
     
     def get_stats(self):
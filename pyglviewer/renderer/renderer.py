@@ -1,15 +1,23 @@
 from dataclasses import dataclass, replace
 from typing import Dict, List, Tuple, Optional
-from OpenGL.GL import *
+from OpenGL.GL import (
+    glClear, glClearColor,
+    GL_BACK, GL_FRONT_AND_BACK, GL_FILL, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA,
+    GL_COLOR_BUFFER_BIT, GL_DEPTH_BUFFER_BIT, GL_STATIC_DRAW, GL_DYNAMIC_DRAW,
+)
 import numpy as np
 from pyglviewer.utils.colour import Colour
 from pyglviewer.utils.config import Config
 from pyglviewer.utils.transform import Transform
 from pyglviewer.renderer.shapes import Shapes, Shape, ArrowDimensions
-from pyglviewer.renderer.objects import VertexBuffer, IndexBuffer, VertexArray, Object
+from pyglviewer.renderer.objects import VertexBuffer, IndexBuffer, VertexArray, UniformBuffer, Object
 from pyglviewer.renderer.render_buffer import RenderBuffer
-from pyglviewer.renderer.light import Light, default_lighting
-from pyglviewer.renderer.shader import Shader, DefaultShaders, PointShape
+from pyglviewer.renderer.instance_buffer import InstanceBuffer
+from pyglviewer.renderer.batch_buffer import BatchBuffer
+from pyglviewer.renderer.gl_state import GLState
+from pyglviewer.renderer.light import Light, LightType, default_lighting
+from pyglviewer.renderer.shader import Shader, DefaultShaders, PointShape, CAMERA_BLOCK_BINDING, CAMERA_BLOCK_SIZE, \
+    MAX_LIGHTS, LIGHT_BLOCK_BINDING, LIGHT_BLOCK_SIZE, LIGHT_FLOATS
 from pyglviewer.gui.imgui_render_buffer import ImguiRenderBuffer, Image, Text
 
 
@@ -63,12 +71,20 @@ class Renderer:
     """
     def __init__(self, config, max_static_vertices, max_static_indices, max_dynamic_vertices, max_dynamic_indices):
         """Initialize renderer with default settings and OpenGL state."""
+        # Cached OpenGL state, shared with the render buffers so redundant state changes are skipped
+        self.gl_state = GLState()
         # Create static and dynamic buffers
-        self.static_buffer = RenderBuffer(max_static_vertices, max_static_indices, GL_STATIC_DRAW)
-        self.dynamic_buffer = RenderBuffer(max_dynamic_vertices, max_dynamic_indices, GL_DYNAMIC_DRAW)
+        self.static_buffer = RenderBuffer(max_static_vertices, max_static_indices, GL_STATIC_DRAW, self.gl_state)
+        self.dynamic_buffer = RenderBuffer(max_dynamic_vertices, max_dynamic_indices, GL_DYNAMIC_DRAW, self.gl_state)
         # Stores the buffer locations of the objects (i.e. object_map['my object'] = { 'buffer': 'static'})
         self.object_map = {}
+        # Instanced objects (many copies of one shape drawn in a single call), see update_instances()
+        self.instance_buffers: Dict[str, InstanceBuffer] = {}
+        # Batched objects (many different shapes, each with its own transform, drawn in a single call), see update_batch()
+        self.batch_buffers: Dict[str, BatchBuffer] = {}
         self.imgui_render_buffer = ImguiRenderBuffer()
+        # Selected objects keyed by (buffer_type, name), in selection order. Kept up to date by select_object() / deselect_all()
+        self._selected_objects: Dict[Tuple[str, str], dict] = {}
 
         self.lights = []
                
@@ -77,11 +93,9 @@ class Renderer:
         self.config = config
 
         # Initialize OpenGL state
-        glEnable(GL_DEPTH_TEST)     # Enable depth testing
-        glEnable(GL_CULL_FACE)      # Enable back-face culling
-        glCullFace(GL_BACK)         # Cull back faces
-        glEnable(GL_BLEND)            # Enable blending for transparent effects
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)   # Define how colours of transparent objects blend when overlapping 
+        self.gl_state.set_depth_test(True)              # Enable depth testing
+        self.gl_state.set_cull_face(True, GL_BACK)      # Enable back-face culling
+        self.gl_state.set_blend(True, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)   # Enable blending, define how colours of transparent objects blend when overlapping 
                         
         self.view_matrix = None
         self.projection_matrix = None
@@ -89,6 +103,13 @@ class Renderer:
         
         # Initialise default shaders
         DefaultShaders.initialise()
+        # Camera matrices shared by every shader, only uploaded when the camera changes
+        self.camera_buffer = UniformBuffer(CAMERA_BLOCK_SIZE, CAMERA_BLOCK_BINDING)
+        self._camera_data = None
+        # Lights shared by every lighting shader, only uploaded when they change
+        self.light_buffer = UniformBuffer(LIGHT_BLOCK_SIZE, LIGHT_BLOCK_BINDING)
+        self._light_data = None
+        self._light_limit_warned = False  # The warning about too many lights is only printed once
 
         
     def add_lights(self, lights):
@@ -111,17 +132,77 @@ class Renderer:
     def draw(self, view_matrix: np.ndarray, projection_matrix: np.ndarray, 
              camera_pos: np.ndarray, lights: Optional[List] = None):
         """Render all objects in the scene, using batching"""
+        self.update_camera_buffer(view_matrix, projection_matrix, camera_pos)
+        if lights:
+            self.update_light_buffer(lights)
+        # Empty scene: skip the render passes and the state resets (nothing has changed the GL state)
+        if not self.static_buffer.objects and not self.dynamic_buffer.objects and not self.instance_buffers and not self.batch_buffers:
+            self.static_buffer.draw_calls = self.dynamic_buffer.draw_calls = 0
+            return
         # Render static objects first
         self.static_buffer.render_buffer(view_matrix, projection_matrix, camera_pos, lights)
         # Then render dynamic objects
         self.dynamic_buffer.render_buffer(view_matrix, projection_matrix, camera_pos, lights)
+        # Then instanced objects
+        for instance_buffer in self.instance_buffers.values():
+            instance_buffer.render_buffer(view_matrix, projection_matrix, camera_pos, lights)
+        # Then batched objects
+        for batch_buffer in self.batch_buffers.values():
+            batch_buffer.render_buffer(view_matrix, projection_matrix, camera_pos, lights)
         
-        # Reset to default state
-        glEnable(GL_DEPTH_TEST)
-        glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
-        glLineWidth(1.0)
-        glPointSize(1.0)
+        # Reset to default state (only issued to OpenGL if the batches changed it)
+        self.gl_state.set_depth_test(True)
+        self.gl_state.set_polygon_mode(GL_FRONT_AND_BACK, GL_FILL)
+        self.gl_state.set_line_width(1.0)
+        self.gl_state.set_point_size(1.0)
  
+    def update_camera_buffer(self, view_matrix: np.ndarray, projection_matrix: np.ndarray, camera_pos: np.ndarray):
+        """Upload the camera to the shared Camera uniform block, if it has changed since the last upload."""
+        # Matrices are stored transposed (the memory layout OpenGL expects), so projection * view is view @ projection
+        camera_data = np.zeros(CAMERA_BLOCK_SIZE // 4, dtype=np.float32)
+        camera_data[0:16] = np.ravel(view_matrix)
+        camera_data[16:32] = np.ravel(projection_matrix)
+        camera_data[32:48] = np.ravel(np.asarray(view_matrix, dtype=np.float32) @ np.asarray(projection_matrix, dtype=np.float32))
+        camera_data[48:51] = camera_pos
+        if self._camera_data is not None and np.array_equal(camera_data, self._camera_data):
+            return
+        self.camera_buffer.update_data(camera_data)
+        self._camera_data = camera_data
+
+    def update_light_buffer(self, lights: List[Light]):
+        """Upload the lights to the shared Lights uniform block, if they have changed since the last upload.
+        Only the first MAX_LIGHTS lights are used."""
+        if len(lights) > MAX_LIGHTS:
+            if not self._light_limit_warned:
+                print(f"Warning: Only the first {MAX_LIGHTS} of {len(lights)} lights are used")
+                self._light_limit_warned = True
+            lights = lights[:MAX_LIGHTS]
+        count = len(lights)
+        data = [light.get_uniform_data() for light in lights]
+
+        def column(field):
+            """Gather a vec3 field over all lights, missing values (e.g. an ambient light's position) are zero."""
+            return np.array([light.get(field, (0, 0, 0)) for light in data], dtype=np.float32)
+
+        # std140 layout, per light: position, intensity | direction, cos(cutoff) | colour, type | attenuation, (padding)
+        light_data = np.zeros(LIGHT_BLOCK_SIZE // 4, dtype=np.float32)
+        rows = light_data[:MAX_LIGHTS * LIGHT_FLOATS].reshape(MAX_LIGHTS, LIGHT_FLOATS)[:count]
+        if count:
+            rows[:, 0:3] = column('position')
+            rows[:, 4:7] = column('direction')
+            rows[:, 8:11] = column('colour')
+            rows[:, 12:15] = column('attenuation')
+            rows[:, 3] = [light['intensity'] for light in data]
+            rows[:, 7] = np.cos([light.get('cutoff', 0.0) for light in data])
+            rows.view(np.int32)[:, 11] = [light['type'] for light in data]
+        light_data.view(np.int32)[MAX_LIGHTS * LIGHT_FLOATS] = count
+        if self._light_data is not None and np.array_equal(light_data, self._light_data):
+            return
+        self.light_buffer.update_data(light_data)
+        self._light_data = light_data
+        # Let the shader compiler unroll the lighting loop for this number of lights
+        DefaultShaders.specialise_lighting(count, any(light['type'] == LightType.SPOT for light in data))
+
     def clear_framebuffer(self):
         """Clear the framebuffer with a dark teal background."""
         r, g, b = self.config["background_colour"]
@@ -180,6 +261,10 @@ class Renderer:
         
         # Create and add object to map if it doesn't already exist
         if name not in self.object_map:
+            if name in self.instance_buffers:
+                raise ValueError(f"Object '{name}' already exists as an instanced object")
+            if name in self.batch_buffers:
+                raise ValueError(f"Object '{name}' already exists as a batched object")
             buffer = self.static_buffer if static else self.dynamic_buffer
             buffer.add_object(name, Object())
             self.object_map[name] = {'buffer': 'static' if static else 'dynamic'} # will default to dynamic if None
@@ -219,18 +304,123 @@ class Renderer:
         if metadata is not None:
             object.set_metadata(metadata)
     
+    def update_instances(
+        self,
+        name:       str,
+        shape:      Optional[Shape] = None,
+        transforms: Optional[list[Transform] | np.ndarray] = None,
+        colours:    Optional[np.ndarray] = None,
+        line_width: Optional[float] = None,
+        alpha:      Optional[float] = None,
+    ):
+        """
+        Create or update an instanced object: many copies of one shape, rendered with a single draw call.
+        Use this instead of update_object() when the same shape (e.g. a marker sphere or a cube) is repeated many times.
+        Instanced objects are not selectable.
+
+        Parameters
+        ----------
+        name : str
+            Unique identifier for this instanced object.
+        shape : Optional[Shape], default=None
+            Shape to instance (required on the first call). Its vertices are uploaded once.
+            Passing a shape on subsequent calls replaces it.
+        transforms : Optional[list[Transform] | np.ndarray], default=None
+            Transform of each instance, or a (N, 4, 4) array of transform matrices.
+        colours : Optional[np.ndarray], default=None
+            (N, 3) colour of each instance, or a single colour for all instances, multiplies the shape's vertex colours.
+        line_width : Optional[float], default=None
+            Width of line primitives. Defaults to 1.0.
+        alpha : Optional[float], default=None
+            Transparency value (0.0 = fully transparent, 1.0 = fully opaque). Defaults to 1.0.
+        """
+        if name in self.object_map:
+            raise ValueError(f"Object '{name}' already exists as a non-instanced object")
+        if name in self.batch_buffers:
+            raise ValueError(f"Object '{name}' already exists as a batched object")
+        if shape is not None:
+            # (Re)create the buffer for this shape
+            if name in self.instance_buffers:
+                self.instance_buffers[name].shutdown()
+            self.instance_buffers[name] = InstanceBuffer(shape, gl_state=self.gl_state)
+        elif name not in self.instance_buffers:
+            raise ValueError(f"A shape must be given on the first call to update_instances() for '{name}'")
+        instance_buffer = self.instance_buffers[name]
+        if transforms is not None:
+            instance_buffer.set_instances(transforms, colours)
+        if line_width is not None:
+            instance_buffer.line_width = line_width
+        if alpha is not None:
+            instance_buffer.alpha = alpha
+
+    def update_batch(
+        self,
+        name:       str,
+        shapes:     Optional[list[Shape]] = None,
+        transforms: Optional[list[Transform] | np.ndarray] = None,
+        colours:    Optional[np.ndarray] = None,
+        line_width: Optional[float] = None,
+        alpha:      Optional[float] = None,
+    ):
+        """
+        Create or update a batched object: many different shapes, each with its own transform, rendered with a single draw call.
+        Use this instead of many update_object() calls when there are lots of small shapes with the same draw type
+        (e.g. the bodies of many different parts). Updating the transforms only uploads the matrices.
+        Batched objects are not selectable.
+
+        Parameters
+        ----------
+        name : str
+            Unique identifier for this batched object.
+        shapes : Optional[list[Shape]], default=None
+            Shapes to batch, all with the same draw type (required on the first call). Their vertices are uploaded once.
+            Passing shapes on subsequent calls replaces them.
+        transforms : Optional[list[Transform] | np.ndarray], default=None
+            Transform of each shape, or a (N, 4, 4) array of transform matrices. Defaults to the identity.
+        colours : Optional[np.ndarray], default=None
+            (N, 3) colour of each shape, or a single colour for all shapes, multiplies the shape's vertex colours.
+        line_width : Optional[float], default=None
+            Width of line primitives. Defaults to 1.0.
+        alpha : Optional[float], default=None
+            Transparency value (0.0 = fully transparent, 1.0 = fully opaque). Defaults to 1.0.
+        """
+        if name in self.object_map:
+            raise ValueError(f"Object '{name}' already exists as a non-batched object")
+        if name in self.instance_buffers:
+            raise ValueError(f"Object '{name}' already exists as an instanced object")
+        if shapes is not None:
+            # (Re)create the buffer for these shapes
+            if name in self.batch_buffers:
+                self.batch_buffers[name].shutdown()
+            self.batch_buffers[name] = BatchBuffer(shapes, gl_state=self.gl_state)
+        elif name not in self.batch_buffers:
+            raise ValueError(f"Shapes must be given on the first call to update_batch() for '{name}'")
+        batch_buffer = self.batch_buffers[name]
+        if transforms is not None:
+            batch_buffer.set_transforms(transforms, colours)
+        if line_width is not None:
+            batch_buffer.line_width = line_width
+        if alpha is not None:
+            batch_buffer.alpha = alpha
+
     def _delete_object(self, name: str):
+        # Instanced objects
+        if name in self.instance_buffers:
+            self.instance_buffers.pop(name).shutdown()
+            return
+        # Batched objects
+        if name in self.batch_buffers:
+            self.batch_buffers.pop(name).shutdown()
+            return
         # Check object exists  
         if name not in self.object_map:
             return
-        buffer = self.static_buffer if self.object_map[name]['buffer'] == 'static' else self.dynamic_buffer
-        object = buffer.objects[name]
-        # Free vertices / indices from the buffer
-        for shape_data in object._shape_data:
-            buffer._free_segment(shape_data)
-        # Remove from object list
-        del buffer.objects[name]
+        buffer_type = self.object_map[name]['buffer']
+        buffer = self.static_buffer if buffer_type == 'static' else self.dynamic_buffer
+        # Free vertices / indices from the buffer and remove from object list
+        buffer.remove_object(name)
         del self.object_map[name]
+        self._selected_objects.pop((buffer_type, name), None)
         
     def delete_objects(self, names: str | list[str]):
         # Support both single name and list of names
@@ -264,27 +454,39 @@ class Renderer:
         
         
         
-    def get_selected_objects(self): 
-        """Get all selected objects."""
-        selected_objects = []
-        for buffer_type in ['static', 'dynamic', 'text', 'image']:
-            
-            if buffer_type == 'static':
-                objects = self.static_buffer.objects
-            elif buffer_type == 'dynamic':
-                objects = self.dynamic_buffer.objects
-            elif buffer_type == 'text':
-                objects = self.imgui_render_buffer.text_objects
-            elif buffer_type == 'image':
-                objects = self.imgui_render_buffer.image_objects
-            else:
-                raise ValueError('Unknown buffer type')
-            for name, obj in objects.items():
-                if obj.get_selected():
-                    if not any(d["object"] == obj for d in selected_objects):
-                        selected_objects.append({"object": obj, "name": name, "buffer_type": buffer_type})
-        # Remove duplicates
-        return selected_objects
+    def select_object(self, selected_obj: dict, selected: Optional[bool] = None):
+        """Select, deselect or toggle the selection of an object.
+        Objects should be selected through the renderer (rather than Object.select()) so get_selected_objects() stays up to date.
+
+        Parameters
+        ----------
+        selected_obj : dict
+            Object to select: { 'object': obj, 'name': 'my_obj', 'buffer_type': 'static' }
+        selected : Optional[bool], default=None
+            True to select, False to deselect, None to toggle. Objects that are not selectable are never selected.
+        """
+        obj, name, buffer_type = selected_obj['object'], selected_obj['name'], selected_obj['buffer_type']
+        if selected is None:
+            obj.toggle_select()
+        elif selected:
+            obj.select()
+        else:
+            obj.deselect()
+        if obj.get_selected():
+            self._selected_objects[(buffer_type, name)] = {'object': obj, 'name': name, 'buffer_type': buffer_type}
+        else:
+            self._selected_objects.pop((buffer_type, name), None)
+
+    def deselect_all(self):
+        """Deselect all selected objects."""
+        for selected_obj in self._selected_objects.values():
+            selected_obj['object'].deselect()
+        self._selected_objects = {}
+
+    def get_selected_objects(self) -> list[dict]:
+        """Get all selected objects, as a list of { 'object': obj, 'name': 'my_obj', 'buffer_type': 'static' }.
+        This is called every frame, so the selection is tracked as it changes rather than found by scanning every object."""
+        return list(self._selected_objects.values())
     
     
     def update_text(
@@ -367,10 +569,14 @@ class Renderer:
     def remove_texts(self, names: str | list[str]):
         """Remove text(s) using either a name id or a list of names"""
         self.imgui_render_buffer.remove_texts(names)
+        for name in [names] if isinstance(names, str) else names:
+            self._selected_objects.pop(('text', name), None)
         
     def remove_images(self, names: str | list[str]):
         """Remove image(s) using either a name id or a list of names"""
         self.imgui_render_buffer.remove_images(names)
+        for name in [names] if isinstance(names, str) else names:
+            self._selected_objects.pop(('image', name), None)
      
     
     def clear(self):
@@ -379,10 +585,19 @@ class Renderer:
         self.dynamic_buffer.clear()
         self.imgui_render_buffer.clear()
         self.object_map = {}
+        self._selected_objects = {}
+        for instance_buffer in self.instance_buffers.values():
+            instance_buffer.shutdown()
+        self.instance_buffers = {}
+        for batch_buffer in self.batch_buffers.values():
+            batch_buffer.shutdown()
+        self.batch_buffers = {}
     
     def get_stats(self):
         """Get combined rendering statistics."""
         return {
             'static': self.static_buffer.get_stats(),
             'dynamic': self.dynamic_buffer.get_stats(),
+            'instanced': {name: instance_buffer.get_stats() for name, instance_buffer in self.instance_buffers.items()},
+            'batched': {name: batch_buffer.get_stats() for name, batch_buffer in self.batch_buffers.items()},
         } |  self.imgui_render_buffer.get_stats()
@@ -1,14 +1,69 @@
 from enum import Enum
+import hashlib
 from OpenGL.GL import *
 from OpenGL.GL import shaders
 import numpy as np
 
 
+# Linked programs shared by shaders with the same source (see Shader.build_program())
+# Source hash -> [program, vertex shader, fragment shader, number of shaders / variants using it]
+_program_cache = {}
+
+
 class PointShape(Enum):
     CIRCLE = 0
     SQUARE = 1
     TRIANGLE = 2
     
+
+# Camera uniform block, shared by every shader and updated once per frame (see Renderer.update_camera_buffer())
+# std140 layout: 3 x mat4 (64 bytes each) + vec4 = 208 bytes
+CAMERA_BLOCK_BINDING = 0
+CAMERA_BLOCK_SIZE = 3 * 64 + 16
+camera_block = """
+layout (std140) uniform Camera {
+    mat4 view;
+    mat4 projection;
+    mat4 viewProjection;   // projection * view
+    vec4 viewPosition;     // Camera position (xyz)
+};
+"""
+
+# Lights uniform block, shared by every lighting shader and updated when the lights change (see Renderer.update_light_buffer())
+# std140 layout: each light is 4 x vec4 (64 bytes), with the scalars packed into the w of the vec3s, followed by numLights
+# The spotlight cutoff is uploaded as its cosine, so it isn't recalculated for every fragment
+MAX_LIGHTS = 10
+LIGHT_BLOCK_BINDING = 1
+LIGHT_FLOATS = 16
+LIGHT_BLOCK_SIZE = MAX_LIGHTS * LIGHT_FLOATS * 4 + 16
+light_block = """
+#define MAX_LIGHTS %d
+
+// Light structure supporting ambient, directional, point, and spot lights
+struct Light {
+    vec3 position;      // Position for point/spot lights
+    float intensity;    // Light intensity multiplier
+    vec3 direction;     // Direction for directional/spot lights
+    float cosCutoff;    // Cosine of the spotlight cone angle (radians)
+    vec3 colour;        // Light colour
+    int type;           // 0=ambient, 1=directional, 2=point, 3=spot
+    vec3 attenuation;   // Distance attenuation factors (constant, linear, quadratic)
+};
+
+layout (std140) uniform Lights {
+    Light lights[MAX_LIGHTS];
+    int numLights;
+};
+
+// Constant when specialised for the scene's lights (see Shader.specialise()), so loops over the lights can be
+// unrolled and the spotlight code removed when there are no spotlights
+#ifndef NUM_LIGHTS
+#define NUM_LIGHTS numLights
+#endif
+#ifndef SPOT_LIGHTS
+#define SPOT_LIGHTS 1
+#endif
+""" % MAX_LIGHTS
     
 # Vertex shader for basic lighting and transformations
 vertex_shader_lighting = """
@@ -23,8 +78,8 @@ out vec3 Colour;     // Final colour passed to fragment shader
 
 // Transformation matrices
 uniform mat4 model;
-uniform mat4 view;
-uniform mat4 projection;
+uniform mat3 normalMatrix;     // Transforms normals to world space (see Shader.normal_matrix())
+""" + camera_block + """
 
 // Colour control
 uniform vec3 uColor;           // Per-object / per-shape colour
@@ -33,11 +88,83 @@ uniform bool uUseVertexColor = true;  // true = use aColour, false = uColor
 void main() {
     vec4 worldPos = model * vec4(aPos, 1.0);
     FragPos = worldPos.xyz;
-    Normal = mat3(transpose(inverse(model))) * aNormal;
+    Normal = normalMatrix * aNormal;
 
     Colour = uUseVertexColor ? aColour : uColor;
 
-    gl_Position = projection * view * worldPos;
+    gl_Position = viewProjection * worldPos;
+}
+"""
+
+# Vertex shader for instanced rendering: the same as above, but each instance has its own model matrix and colour
+vertex_shader_lighting_instanced = """
+#version 330 core
+layout (location = 0) in vec3 aPos;      // Vertex position
+layout (location = 1) in vec3 aColour;   // Optional vertex colour
+layout (location = 2) in vec3 aNormal;   // Vertex normal
+layout (location = 3) in mat4 aInstanceModel;   // Per-instance model matrix (locations 3-6)
+layout (location = 7) in vec3 aInstanceColour;  // Per-instance colour (multiplies the vertex colour)
+layout (location = 8) in mat3 aInstanceNormalMatrix;  // Per-instance normal matrix (locations 8-10)
+
+out vec3 FragPos;    // Fragment position in world space
+out vec3 Normal;     // Fragment normal in world space
+out vec3 Colour;     // Final colour passed to fragment shader
+
+// Transformation matrices
+uniform mat4 model;
+uniform mat3 normalMatrix;
+""" + camera_block + """
+
+// Colour control
+uniform vec3 uColor;           // Per-object / per-shape colour
+uniform bool uUseVertexColor = true;  // true = use aColour * aInstanceColour, false = uColor
+
+void main() {
+    mat4 instanceModel = model * aInstanceModel;
+    vec4 worldPos = instanceModel * vec4(aPos, 1.0);
+    FragPos = worldPos.xyz;
+    Normal = normalMatrix * aInstanceNormalMatrix * aNormal;
+
+    Colour = uUseVertexColor ? aColour * aInstanceColour : uColor;
+
+    gl_Position = viewProjection * worldPos;
+}
+"""
+
+# Vertex shader for batched rendering: many different shapes merged into one buffer, each vertex has the index of its
+# shape, which is used to read the shape's model matrix, normal matrix and colour from a texture buffer
+vertex_shader_lighting_batched = """
+#version 330 core
+layout (location = 0) in vec3 aPos;      // Vertex position
+layout (location = 1) in vec3 aColour;   // Optional vertex colour
+layout (location = 2) in vec3 aNormal;   // Vertex normal
+layout (location = 3) in float aShapeIndex;  // Index of the shape the vertex belongs to
+
+out vec3 FragPos;    // Fragment position in world space
+out vec3 Normal;     // Fragment normal in world space
+out vec3 Colour;     // Final colour passed to fragment shader
+
+// Per-shape data, 8 texels per shape: model matrix columns (0-3), normal matrix columns (4-6), colour (7)
+uniform samplerBuffer shapeData;
+""" + camera_block + """
+
+// Colour control
+uniform vec3 uColor;           // Per-object / per-shape colour
+uniform bool uUseVertexColor = true;  // true = use aColour * shape colour, false = uColor
+
+void main() {
+    int base = int(aShapeIndex) * 8;
+    mat4 shapeModel = mat4(texelFetch(shapeData, base), texelFetch(shapeData, base + 1),
+                           texelFetch(shapeData, base + 2), texelFetch(shapeData, base + 3));
+    mat3 shapeNormalMatrix = mat3(texelFetch(shapeData, base + 4).xyz, texelFetch(shapeData, base + 5).xyz,
+                                  texelFetch(shapeData, base + 6).xyz);
+    vec4 worldPos = shapeModel * vec4(aPos, 1.0);
+    FragPos = worldPos.xyz;
+    Normal = shapeNormalMatrix * aNormal;
+
+    Colour = uUseVertexColor ? aColour * texelFetch(shapeData, base + 7).rgb : uColor;
+
+    gl_Position = viewProjection * worldPos;
 }
 """
 
@@ -50,22 +177,7 @@ in vec3 Colour;      // Fragment colour
 
 out vec4 FragColour;
 
-#define MAX_LIGHTS 10
-
-// Light structure supporting ambient, directional, point, and spot lights
-struct Light {
-    int type;           // 0=ambient, 1=directional, 2=point, 3=spot
-    vec3 position;      // Position for point/spot lights
-    vec3 direction;     // Direction for directional/spot lights
-    vec3 colour;        // Light colour
-    float intensity;    // Light intensity multiplier
-    vec3 attenuation;   // Distance attenuation factors (constant, linear, quadratic)
-    float cutoff;       // Spotlight cone angle in radians
-};
-
-uniform Light lights[MAX_LIGHTS];
-uniform int numLights;
-uniform vec3 viewPos;   // Camera position for specular calculation
+""" + light_block + camera_block + """
 uniform float alpha = 1.0;  // Add alpha uniform
 
 vec3 calcLight(Light light, vec3 normal, vec3 fragPos, vec3 viewDir) {
@@ -86,12 +198,14 @@ vec3 calcLight(Light light, vec3 normal, vec3 fragPos, vec3 viewDir) {
              light.attenuation.y * distance +
              light.attenuation.z * distance * distance);
 
+#if SPOT_LIGHTS
         if (light.type == 3) {  // Spot light cone check
             float theta = dot(lightDir, normalize(-light.direction));
-            if (theta <= cos(light.cutoff)) {
+            if (theta <= light.cosCutoff) {
                 return vec3(0.0);
             }
         }
+#endif
     }
 
     // Blinn-Phong lighting calculation
@@ -108,10 +222,10 @@ vec3 calcLight(Light light, vec3 normal, vec3 fragPos, vec3 viewDir) {
 
 void main() {
     vec3 norm = normalize(Normal);
-    vec3 viewDir = normalize(viewPos - FragPos);
+    vec3 viewDir = normalize(viewPosition.xyz - FragPos);
 
     vec3 result = vec3(0.0);
-    for (int i = 0; i < numLights; i++) {
+    for (int i = 0; i < NUM_LIGHTS; i++) {
         result += calcLight(lights[i], norm, FragPos, viewDir);
     }
 
@@ -128,8 +242,7 @@ layout (location = 2) in vec3 aNormal;   // Vertex normal
 out vec3 Colour;
 // Transformation matrices
 uniform mat4 model;
-uniform mat4 view;
-uniform mat4 projection;
+""" + camera_block + """
 uniform float pointSize = 10.0;
 
 // Colour control
@@ -139,7 +252,7 @@ uniform bool uUseVertexColor = true;
 void main() {
     Colour = uUseVertexColor ? aColour : uColor;
 
-    gl_Position = projection * view * model * vec4(aPos, 1.0);
+    gl_Position = viewProjection * model * vec4(aPos, 1.0);
     gl_PointSize = pointSize;
 }
 """
@@ -185,6 +298,10 @@ class Shader:
     transformations for 3D rendering with lighting.
     """
 
+    # Uniform names of each light's fields, built once rather than formatted on every upload
+    LIGHT_UNIFORM_NAMES = [{key: f'lights[{i}].{key}' for key in ('type', 'position', 'direction', 'colour', 'intensity', 'attenuation', 'cutoff')}
+                           for i in range(MAX_LIGHTS)]
+
     def __init__(self, vertex_shader, fragment_shader):
         """Initialize shader program from vertex and fragment shader sources.
 
@@ -200,10 +317,78 @@ class Shader:
         RuntimeError
             If shader compilation or program linking fails
         """
+        self.vertex_source = vertex_shader
+        self.fragment_source = fragment_shader
+        self.build_program(vertex_shader, fragment_shader)
+        # Shaders that declare the shared uniform blocks don't need the camera / lights set as uniforms
+        self.uses_camera_block = glGetUniformBlockIndex(self.program, 'Camera') != GL_INVALID_INDEX
+        self.uses_light_block = glGetUniformBlockIndex(self.program, 'Lights') != GL_INVALID_INDEX
+        # Current #defines, and the programs compiled for other #defines (see specialise())
+        self.defines = {}
+        self._variants = {}
+        # Reused to convert list / tuple matrices to float32, rather than allocating an array per call
+        self._mat3_scratch = np.empty(9, dtype=np.float32)
+        self._mat4_scratch = np.empty(16, dtype=np.float32)
+
+    def build_program(self, vertex_shader, fragment_shader):
+        """Compile and link the shader program, replacing the current one.
+
+        Parameters
+        ----------
+        vertex_shader : str
+            GLSL vertex shader source code
+        fragment_shader : str
+            GLSL fragment shader source code
+        """
+        # Programs are shared by shaders (and variants) with the same source, so each is only compiled once
+        self.program_key = hashlib.blake2b(f'{vertex_shader}\0{fragment_shader}'.encode(), digest_size=16).hexdigest()
+        # Uniform locations by name, looked up from the program on first use
+        self._uniform_locations = {}
+        cached = _program_cache.get(self.program_key)
+        if cached is not None:
+            self.program, self.vertex_shader, self.fragment_shader = cached[:3]
+            cached[3] += 1
+            return
+
         self.vertex_shader = self.compile_shader(vertex_shader, GL_VERTEX_SHADER)
         self.fragment_shader = self.compile_shader(fragment_shader, GL_FRAGMENT_SHADER)
         self.program = shaders.compileProgram(self.vertex_shader, self.fragment_shader)
         self.validate_program()
+        # Attach the uniform blocks (if declared) to their binding points
+        for block, binding in (('Camera', CAMERA_BLOCK_BINDING), ('Lights', LIGHT_BLOCK_BINDING)):
+            block_index = glGetUniformBlockIndex(self.program, block)
+            if block_index != GL_INVALID_INDEX:
+                glUniformBlockBinding(self.program, block_index, binding)
+        _program_cache[self.program_key] = [self.program, self.vertex_shader, self.fragment_shader, 1]
+
+    def specialise(self, **defines):
+        """Switch to a variant of this shader compiled with the given #defines, e.g. specialise(NUM_LIGHTS=3).
+
+        Constants let the GLSL compiler unroll loops and remove unused code. Each variant is compiled the first
+        time it is used and kept, so switching back to it is free. Uniforms must be set again after switching.
+
+        Parameters
+        ----------
+        **defines : int
+            Values of the macros to define, replacing any previous #defines
+        """
+        key = tuple(sorted(defines.items()))
+        current_key = tuple(sorted(self.defines.items()))
+        if key == current_key:
+            return
+        self._variants[current_key] = (self.program_key, self.program, self.vertex_shader, self.fragment_shader, self._uniform_locations)
+        if key in self._variants:
+            self.program_key, self.program, self.vertex_shader, self.fragment_shader, self._uniform_locations = self._variants.pop(key)
+        else:
+            header = ''.join(f'#define {name} {int(value)}\n' for name, value in key)
+            self.build_program(self._insert_header(self.vertex_source, header), self._insert_header(self.fragment_source, header))
+        self.defines = dict(defines)
+
+    @staticmethod
+    def _insert_header(source, header):
+        """Insert lines into GLSL source code, after the #version directive (which must come first)."""
+        version_end = source.index('\n', source.index('#version')) + 1
+        return source[:version_end] + header + source[version_end:]
 
     def compile_shader(self, source, shader_type):
         """Compile a single shader from source.
@@ -267,7 +452,10 @@ class Shader:
         ValueError
             If value type or size is not supported
         """
-        location = glGetUniformLocation(self.program, name)
+        location = self._uniform_locations.get(name)
+        if location is None:
+            location = glGetUniformLocation(self.program, name)
+            self._uniform_locations[name] = location
         if location == -1:
             # print(f"Error: Uniform '{name}' not found in shader program.")
             return
@@ -278,7 +466,8 @@ class Shader:
             glUniform1f(location, value)
         elif isinstance(value, (list, tuple, np.ndarray)):
             if isinstance(value, np.ndarray):
-                value = value.flatten()
+                # No copy for contiguous float32 arrays (e.g. the transform matrices), which OpenGL reads directly
+                value = np.ascontiguousarray(value, dtype=np.float32).ravel()
             if len(value) == 2:
                 glUniform2f(location, *value)
             elif len(value) == 3:
@@ -286,38 +475,93 @@ class Shader:
             elif len(value) == 4:
                 glUniform4f(location, *value)
             elif len(value) == 9:  # 3x3 matrix
-                glUniformMatrix3fv(location, 1, GL_FALSE, (GLfloat * 9)(*value))
+                if not isinstance(value, np.ndarray):
+                    self._mat3_scratch[:] = value
+                    value = self._mat3_scratch
+                glUniformMatrix3fv(location, 1, GL_FALSE, value)
             elif len(value) == 16:  # 4x4 matrix
-                glUniformMatrix4fv(location, 1, GL_FALSE, (GLfloat * 16)(*value))
+                if not isinstance(value, np.ndarray):
+                    self._mat4_scratch[:] = value
+                    value = self._mat4_scratch
+                glUniformMatrix4fv(location, 1, GL_FALSE, value)
             else:
                 raise ValueError(f"Unsupported uniform vector size: {len(value)}")
         else:
             raise ValueError(f"Unsupported uniform type: {type(value)}")
 
     def set_light_uniforms(self, lights):
-        """Set uniforms for all lights in the scene.
+        """Set uniforms for all lights in the scene, only needed for shaders that don't declare the shared Lights uniform block.
 
         Parameters
         ----------
         lights : list
             List of Light objects to upload to shader
         """
+        if self.uses_light_block:
+            return
         self.use()
-        self.set_uniform('numLights', len(lights))
-        for i, light in enumerate(lights):
+        self.set_uniform('numLights', min(len(lights), MAX_LIGHTS))
+        for light, names in zip(lights, self.LIGHT_UNIFORM_NAMES):
             light_data = light.get_uniform_data()
             for key, value in light_data.items():
-                self.set_uniform(f'lights[{i}].{key}', value)
+                self.set_uniform(names[key], value)
 
-    def set_model_matrix(self, model_matrix):
+    def set_model_matrix(self, model_matrix, normal_matrix=None):
         """Set the model transformation matrix.
 
         Parameters
         ----------
         model_matrix : np.ndarray
             4x4 model transformation matrix
+        normal_matrix : np.ndarray, optional
+            3x3 normal matrix of model_matrix, calculated if not given (see normal_matrix())
         """
         self.set_uniform("model", model_matrix)
+        self.set_uniform("normalMatrix", self.normal_matrix(model_matrix) if normal_matrix is None else normal_matrix)
+
+    @staticmethod
+    def normal_matrix(model_matrix):
+        """Calculate the matrix which transforms normals, so that they stay perpendicular to the transformed surface.
+
+        This is the cofactor matrix of the upper 3x3, i.e. transpose(inverse(model)) scaled by det(model).
+        The shaders normalise the normals, so the scale is irrelevant, but unlike the inverse it also exists when
+        an axis is scaled to zero. Works on the transposed matrices used for uploading, and on stacks of matrices.
+
+        Parameters
+        ----------
+        model_matrix : np.ndarray
+            (..., 4, 4) or (..., 3, 3) model transformation matrices
+
+        Returns
+        -------
+        np.ndarray
+            (..., 3, 3) float32 normal matrices, in the same layout as model_matrix
+        """
+        m = np.asarray(model_matrix, dtype=np.float32)[..., :3, :3]
+        cofactor = np.stack((np.cross(m[..., 1, :], m[..., 2, :]),
+                             np.cross(m[..., 2, :], m[..., 0, :]),
+                             np.cross(m[..., 0, :], m[..., 1, :])), axis=-2)
+        # Keep the normals facing outwards for mirroring transforms (negative determinant)
+        determinant = np.sum(m[..., 0, :] * cofactor[..., 0, :], axis=-1)
+        return np.where(determinant[..., None, None] < 0, -cofactor, cofactor).astype(np.float32, copy=False)
+
+    def set_camera(self, view_matrix, projection_matrix, view_position):
+        """Set the camera uniforms, only needed for shaders that don't declare the shared Camera uniform block.
+
+        Parameters
+        ----------
+        view_matrix : np.ndarray
+            4x4 view transformation matrix
+        projection_matrix : np.ndarray
+            4x4 projection transformation matrix
+        view_position : np.ndarray
+            3D camera position vector
+        """
+        if self.uses_camera_block:
+            return
+        self.set_view_matrix(view_matrix)
+        self.set_projection_matrix(projection_matrix)
+        self.set_view_position(view_position)
 
     def set_view_matrix(self, view_matrix):
         """Set the view transformation matrix.
@@ -376,17 +620,32 @@ class Shader:
         """Set the alpha (transparency) value for rendering."""
         self.set_uniform('alpha', alpha)
 
+    @staticmethod
+    def _release_program(program_key):
+        """Stop using a cached program, deleting it if no other shader uses it."""
+        cached = _program_cache.get(program_key)
+        if cached is None:
+            return
+        cached[3] -= 1
+        if cached[3] <= 0:
+            del _program_cache[program_key]
+            if bool(glDeleteProgram):  # Check if OpenGL functions are still available
+                glDeleteProgram(cached[0])
+
     def shutdown(self):
-        """Delete shader program and individual shaders."""
+        """Delete shader program and individual shaders, including those of other variants (see specialise()).
+
+        Programs shared with other shaders (see build_program()) are only deleted once no shader uses them.
+        """
         try:
-            if self.program and bool(glDeleteProgram):  # Check if OpenGL functions are still available
-                glDeleteProgram(self.program)
+            # compileProgram() has already flagged the shaders for deletion, they go with their program
+            for program_key, _, _, _, _ in self._variants.values():
+                self._release_program(program_key)
+            self._variants = {}
+            if self.program:
+                self._release_program(self.program_key)
                 self.program = None
-            if self.vertex_shader and bool(glDeleteShader):
-                glDeleteShader(self.vertex_shader)
                 self.vertex_shader = None
-            if self.fragment_shader and bool(glDeleteShader):
-                glDeleteShader(self.fragment_shader)
                 self.fragment_shader = None
         except:
             # Ignore errors during shutdown
@@ -400,9 +659,27 @@ class DefaultShaders:
     """Manage default shaders."""
     default_shader = None
     default_point_shader = None
+    default_instanced_shader = None
+    default_batched_shader = None
 
     @staticmethod
     def initialise():
         """Initialise default shaders, should be called once at start of program after OpenGL initialisation."""
         DefaultShaders.default_shader = Shader(vertex_shader_lighting, fragment_shader_lighting)
         DefaultShaders.default_point_shader = Shader(vertex_shader_points, fragment_shader_points)
+        DefaultShaders.default_instanced_shader = Shader(vertex_shader_lighting_instanced, fragment_shader_lighting)
+        DefaultShaders.default_batched_shader = Shader(vertex_shader_lighting_batched, fragment_shader_lighting)
+
+    @staticmethod
+    def specialise_lighting(num_lights, spot_lights=True):
+        """Compile the lighting shaders for a fixed number of lights (see Shader.specialise()).
+
+        Parameters
+        ----------
+        num_lights : int
+            Number of lights in the Lights uniform block
+        spot_lights : bool, optional
+            Whether any of the lights are spotlights (default: True)
+        """
+        for shader in (DefaultShaders.default_shader, DefaultShaders.default_instanced_shader, DefaultShaders.default_batched_shader):
+            shader.specialise(NUM_LIGHTS=num_lights, SPOT_LIGHTS=spot_lights)
@@ -6,10 +6,30 @@ Includes vertex data structures, shapes, and shape factory methods.
 
 import numpy as np
 from dataclasses import dataclass
+from functools import lru_cache
 from OpenGL.GL import *
 from pyglviewer.utils.colour import Colour
 from pyglviewer.utils.transform import Transform
 from pyglviewer.renderer.shader import Shader, DefaultShaders
+from pyglviewer.renderer import _transform_numba
+
+@lru_cache(maxsize=32)
+def _ring(segments):
+    """Cos / sin tables for `segments` evenly spaced angles around a circle (cached per segment count).
+    
+    Returns:
+        tuple: (cos_table, sin_table) read-only float32 arrays of length segments
+    """
+    theta = np.linspace(0, 2 * np.pi, segments, endpoint=False, dtype=np.float32)
+    cos_table, sin_table = np.cos(theta), np.sin(theta)
+    cos_table.flags.writeable = False
+    sin_table.flags.writeable = False
+    return cos_table, sin_table
+
+# Corners of a unit rectangle centred on the origin, anticlockwise from the bottom left
+_UNIT_RECTANGLE = np.array([(-0.5, -0.5, 0), (0.5, -0.5, 0), (0.5, 0.5, 0), (-0.5, 0.5, 0)], dtype=np.float32)
+_UNIT_RECTANGLE.flags.writeable = False
+
 
 @dataclass
 class ArrowDimensions:
@@ -24,6 +44,8 @@ class Vertex:
     Represents a vertex in 3D space with position, colour, and normal attributes.
     Provides memory layout information for OpenGL vertex buffer organization.
     Each vertex contains position (xyz), colour (rgb), and normal (xyz) data.
+    In the vertex buffer, positions are kept as float32 while normals are quantized to 10 bits per component and
+    colours to bytes (see GPU_DTYPE), 20 bytes per vertex rather than 36.
     
     Attributes:
         position (np.array): 3D position vector (x, y, z)
@@ -31,6 +53,10 @@ class Vertex:
         normal (np.array): Normal vector (nx, ny, nz)
     """
 
+    # Packed vertex buffer layout: position (3 x float32), normal (GL_INT_2_10_10_10_REV: x, y, z as signed 10 bit
+    # integers in the low 30 bits, w unused), colour (4 x uint8, a unused)
+    GPU_DTYPE = np.dtype([('position', np.float32, 3), ('normal', np.uint32), ('colour', np.uint8, 4)])
+
     def __init__(self, position, colour, normal):
         self.position = np.array(position, dtype=np.float32)
         self.colour = np.array(colour, dtype=np.float32)
@@ -48,15 +74,49 @@ class Vertex:
             normal=data[offset+6:offset+9]
         )
 
+    @staticmethod
+    def pack(positions, colours, normals):
+        """Pack vertex arrays into the vertex buffer layout, quantizing the normals & colours.
+        
+        Args:
+            positions (np.ndarray): (N, 3) positions
+            colours (np.ndarray): (N, 3) colours in the range [0, 1]
+            normals (np.ndarray): (N, 3) unit normals
+        
+        Returns:
+            np.ndarray: (N,) array of Vertex.GPU_DTYPE
+        """
+        packed = np.zeros(len(positions), dtype=Vertex.GPU_DTYPE)
+        packed['position'] = positions
+        # Normalized attributes: 10 bit signed integers map [-511, 511] to [-1, 1] and uint8 maps [0, 255] to [0, 1]
+        components = np.rint(np.clip(normals, -1.0, 1.0) * 511.0).astype(np.int32) & 0x3FF  # Two's complement, 10 bits
+        packed['normal'] = components[:, 0] | (components[:, 1] << 10) | (components[:, 2] << 20)
+        packed['colour'][:, :3] = np.rint(np.clip(colours, 0.0, 1.0) * 255.0)
+        return packed
+
     @staticmethod
     def vertex_size():
         """Get the size of a vertex in bytes."""
-        return 9 * np.dtype(np.float32).itemsize
+        return Vertex.GPU_DTYPE.itemsize
     
     @staticmethod
     def index_size():
         """Get the size of a index in bytes."""
         return np.dtype(np.uint32).itemsize
+
+    @staticmethod
+    def layout():
+        """Get the vertex attribute layout (position, colour, normal) shared by every vertex buffer."""
+        stride = Vertex.vertex_size()
+        fields = Vertex.GPU_DTYPE.fields
+        return [
+            # Position attribute (location=0)
+            {'index': 0, 'size': 3, 'type': GL_FLOAT, 'normalized': False, 'stride': stride, 'offset': fields['position'][1]},
+            # Colour attribute (location=1), the shader only reads rgb
+            {'index': 1, 'size': 4, 'type': GL_UNSIGNED_BYTE, 'normalized': True, 'stride': stride, 'offset': fields['colour'][1]},
+            # Normal attribute (location=2), the shader only reads xyz
+            {'index': 2, 'size': 4, 'type': GL_INT_2_10_10_10_REV, 'normalized': True, 'stride': stride, 'offset': fields['normal'][1]},
+        ]
     
 class Shape:
     
@@ -64,11 +124,15 @@ class Shape:
     Container for 3D shape data including vertices and indices.
     Use the Shapes factory class for helper functions to create shape objects.
     Provides methods for combining and transforming shapes.
-    Vertices are stored in their transformed state.
+    Vertices are stored in their transformed state, as separate position, colour and normal arrays (structure of arrays),
+    which are only interleaved (and quantized, see Vertex.pack()) when uploaded to OpenGL.
+    Arrays may be shared read-only views (e.g. a broadcast colour or a cached prototype), so replace rather than modify them in place.
 
     Attributes:
         draw_type (int): OpenGL draw type (GL_TRIANGLES, GL_LINES, etc.)
-        vertices (list[Vertex]): List of vertices defining the shape
+        positions (np.ndarray): (N, 3) float32 vertex positions
+        colours (np.ndarray): (N, 3) float32 vertex colours
+        normals (np.ndarray): (N, 3) float32 vertex normals
         indices (np.array): Indices of the vertices to render
     """
     def __init__(self, draw_type, vertices=None, indices=None, shader=None):
@@ -79,11 +143,71 @@ class Shape:
         """
         self.draw_type = self.set_draw_type(draw_type) # TODO: Rename primitive
         self.shader = self.set_shader(shader)
-        self.vertices = np.array(vertices, dtype=Vertex) if vertices is not None else np.array([], dtype=np.float32)
-        self.vertex_data = self.flatten_vertices() # must be updated anytime vertices change
-        self.indices = np.array(indices, dtype=np.uint32) if indices is not None else np.array([], dtype=np.float32)
-        self.vertex_count = len(vertices) if vertices is not None else 0
-        self.index_count = len(indices) if indices is not None else 0
+        self._set_vertex_objects(vertices if vertices is not None else [])
+        self.indices = np.array(indices, dtype=np.uint32) if indices is not None else np.array([], dtype=np.uint32)
+        self.index_count = len(self.indices)
+
+    @staticmethod
+    def from_arrays(draw_type, positions, colours, normals, indices, shader=None):
+        """Create a shape directly from arrays, without creating a Vertex object per vertex.
+        
+        Args:
+            draw_type (int): OpenGL draw type (GL_TRIANGLES, GL_LINES, etc.)
+            positions (np.ndarray): (N, 3) vertex positions
+            colours (np.ndarray): (N, 3) vertex colours, or a single (3,) colour for every vertex (broadcast, not copied)
+            normals (np.ndarray): (N, 3) vertex normals, or a single (3,) normal for every vertex (broadcast, not copied)
+            indices (np.ndarray): Indices of the vertices to render
+            shader (Shader): Shader used to render the shape. Defaults to the default shader
+        
+        Returns:
+            Shape: Shape containing the given vertex data
+        """
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        shape = Shape(draw_type, shader=shader)
+        shape.positions = positions
+        shape.colours = np.broadcast_to(np.asarray(colours, dtype=np.float32), positions.shape)
+        shape.normals = np.broadcast_to(np.asarray(normals, dtype=np.float32), positions.shape)
+        shape.vertex_count = len(positions)
+        shape._vertices = None
+        shape.set_indices(np.asarray(indices, dtype=np.uint32).reshape(-1))
+        return shape
+
+    @property
+    def vertices(self):
+        """list[Vertex]: Vertices of the shape (created from the arrays on first access)."""
+        if self._vertices is None:
+            self._vertices = np.array([Vertex(position, colour, normal) for position, colour, normal in zip(self.positions, self.colours, self.normals)], dtype=Vertex)
+        return self._vertices
+
+    @vertices.setter
+    def vertices(self, vertices):
+        self._set_vertex_objects(vertices)
+
+    def _set_vertex_objects(self, vertices):
+        """Set the vertex arrays from a list of Vertex objects."""
+        self._vertices = np.array(vertices, dtype=Vertex)
+        self.positions = np.array([vertex.position for vertex in vertices], dtype=np.float32).reshape(-1, 3)
+        self.colours = np.array([vertex.colour for vertex in vertices], dtype=np.float32).reshape(-1, 3)
+        self.normals = np.array([vertex.normal for vertex in vertices], dtype=np.float32).reshape(-1, 3)
+        self.vertex_count = len(self.positions)
+        self._local_bounds = None
+
+    @property
+    def vertex_data(self):
+        """np.ndarray: Flattened, interleaved float32 vertex data [x,y,z, r,g,b, nx,ny,nz, x,y,z...]."""
+        vertex_data = np.empty((self.vertex_count, 9), dtype=np.float32)
+        vertex_data[:, 0:3] = self.positions
+        vertex_data[:, 3:6] = self.colours
+        vertex_data[:, 6:9] = self.normals
+        return vertex_data.reshape(-1)
+
+    def interleave(self):
+        """Pack the position, colour and normal arrays into the interleaved layout used by the vertex buffer.
+        
+        Returns:
+            np.ndarray: (N,) array of Vertex.GPU_DTYPE
+        """
+        return Vertex.pack(self.positions, self.colours, self.normals)
 
     def __add__(self, other):
         """Combine two shapes into a single shape.
@@ -100,66 +224,81 @@ class Shape:
         """
         if not isinstance(other, Shape):
             raise TypeError("Can only add Shape to Shape")
+        return Shape.concat([self, other])
 
-        if self.draw_type != other.draw_type:
-            raise ValueError("Cannot combine shapes with different draw types")
-
-        if self.shader != other.shader:
-            raise ValueError("Cannot combine shapes with different shaders")
+    @staticmethod
+    def concat(shapes):
+        """Combine any number of shapes into a single shape.
+        The combined size is allocated once, so prefer this over chaining `+` when joining many shapes.
 
-        # Combine vertices (list of Vertex objects)
-        combined_vertices = list(self.vertices) + list(other.vertices)
+        Args:
+            shapes (list[Shape]): Shapes to combine, all with the same draw type and shader
 
-        # Adjust indices for the second shape
-        offset = len(self.vertices)
-        adjusted_other_indices = [i + offset for i in other.indices]
+        Returns:
+            Shape: Combined shape with adjusted indices
 
-        # Combine indices
-        combined_indices = np.concatenate(
-            (self.indices, np.array(adjusted_other_indices, dtype=np.uint32))
+        Raises:
+            ValueError: If no shapes are given or shapes are incompatible (different draw types or shaders)
+        """
+        if len(shapes) == 0:
+            raise ValueError("Cannot combine an empty list of shapes")
+        first = shapes[0]
+        for shape in shapes[1:]:
+            if first.draw_type != shape.draw_type:
+                raise ValueError("Cannot combine shapes with different draw types")
+            if first.shader != shape.shader:
+                raise ValueError("Cannot combine shapes with different shaders")
+
+        # Allocate the combined index data once, offsetting each shape's indices by the number of vertices before it
+        indices = np.empty(sum(len(shape.indices) for shape in shapes), dtype=np.uint32)
+        vertex_offset, index_offset = 0, 0
+        for shape in shapes:
+            np.add(shape.indices, vertex_offset, out=indices[index_offset:index_offset + len(shape.indices)], casting='unsafe')
+            vertex_offset += shape.vertex_count
+            index_offset += len(shape.indices)
+
+        # Each vertex array is concatenated independently
+        return Shape.from_arrays(
+            first.draw_type,
+            np.concatenate([shape.positions for shape in shapes]),
+            np.concatenate([shape.colours for shape in shapes]),
+            np.concatenate([shape.normals for shape in shapes]),
+            indices,
+            first.shader
         )
 
-        # Create new Shape (constructor will regenerate vertex_data etc.)
-        return Shape(self.draw_type, combined_vertices, combined_indices, self.shader)
-
 
     def flatten_vertices(self):
         '''Returns np.ndarray: Flattened array of vertex data [x,y,z, r,g,b, nx,ny,nz, x,y,z...]'''
-        vertices = np.array([]) if len(self.vertices) == 0 else np.concatenate([vertex.to_array() for vertex in self.vertices])
-        return vertices.astype(np.float32)
+        return self.vertex_data
     
     def set_draw_type(self, draw_type):
         self.draw_type = draw_type
         return draw_type
         
     def set_shader(self, shader):
-        self.shader = shader or DefaultShaders.default_shader
+        self.shader = shader if shader is not None else DefaultShaders.default_shader
         return self.shader
 
     def set_vertices(self, data):
         """Update vertex data.
         
         Args:
-            data (np.ndarray or list): New vertex data
+            data (np.ndarray or list): New vertex data, either flat interleaved [x,y,z, r,g,b, nx,ny,nz, ...] or a list of Vertex
         
         Returns:
             None
         """
         if isinstance(data, np.ndarray):
-            vertex_count = len(data) // Vertex.SIZE
-            vertices = []
-            for i in range(vertex_count):
-                idx = i * Vertex.SIZE
-                vertices.append(Vertex(
-                    position=data[idx:idx+3],
-                    colour=data[idx+3:idx+6],
-                    normal=data[idx+6:idx+9]
-                ))
-            self.vertices = np.array(vertices, dtype=Vertex)
+            data = np.asarray(data, dtype=np.float32).reshape(-1, 9)
+            self.positions = data[:, 0:3].copy()
+            self.colours = data[:, 3:6].copy()
+            self.normals = data[:, 6:9].copy()
+            self.vertex_count = len(data)
+            self._vertices = None
+            self._local_bounds = None
         else:
-            self.vertices = np.array(data, dtype=Vertex)
-        self.vertex_count = len(self.vertices)
-        self.vertex_data = self.flatten_vertices()
+            self._set_vertex_objects(data)
 
 
     def set_indices(self, data):
@@ -189,36 +328,64 @@ class Shape:
             return self
 
         transform = Transform(translate, rotate, scale)
+        matrix = transform.transform_matrix()
         
-        try:
-            normal_matrix = np.linalg.inv(transform.transform_matrix()[:3, :3]).T
-        except np.linalg.LinAlgError:
-            return self
-
-        for vertex in self.vertices:
-            # Transform position
-            vertex.position = transform.transform_position(vertex.position)
-            # Transform normal
-            vertex.normal = normal_matrix @ vertex.normal
-            vertex.normal = vertex.normal / np.linalg.norm(vertex.normal)
-        # Update the vertex data since vertices has changed
-        self.vertex_data = self.flatten_vertices()
+        if transform.scale[0] == transform.scale[1] == transform.scale[2] != 0:
+            # Uniform scale: normals are renormalised, so the rotation * scale matrix itself keeps them perpendicular
+            normal_matrix = np.ascontiguousarray(matrix[:3, :3])
+        else:
+            try:
+                normal_matrix = np.linalg.inv(matrix[:3, :3]).T.astype(np.float32, copy=False)
+            except np.linalg.LinAlgError:
+                return self
+
+        # Not a projection, so skip the homogeneous coordinate: p' = p @ (R*S).T + t, applied to all vertices at once.
+        # Only positions & normals are touched, new arrays are created as the current ones may be shared / read-only
+        if _transform_numba.NUMBA_AVAILABLE and self.vertex_count >= _transform_numba.MIN_VERTICES:
+            # Large shapes: single pass compiled kernel, multithreaded for very large shapes
+            positions, normals = np.empty_like(self.positions), np.empty_like(self.positions)
+            apply_trs = _transform_numba.apply_trs_parallel if self.vertex_count >= _transform_numba.MIN_PARALLEL_VERTICES else _transform_numba.apply_trs
+            apply_trs(self.positions, np.ascontiguousarray(self.normals), np.ascontiguousarray(matrix[:3, :3]), np.ascontiguousarray(matrix[:3, 3]), normal_matrix, positions, normals)
+        else:
+            positions = self.positions @ matrix[:3, :3].T + matrix[:3, 3]
+            # Transform normals by the inverse transpose and renormalise
+            normals = self.normals @ normal_matrix.T
+            norms = np.linalg.norm(normals, axis=1, keepdims=True)
+            normals = np.divide(normals, norms, out=normals, where=norms > 0)
+        self.positions, self.normals = positions, normals
+        # Vertex objects are recreated from the arrays when next accessed
+        self._vertices = None
+        self._local_bounds = None
 
         return self
     
+    def local_bounds(self):
+        """Get the bounding box of the vertex positions (cached until the vertices change).
+        
+        Returns:
+            tuple: (min, max) float32 arrays of shape (3,), or None if the shape has no vertices
+        """
+        if self._local_bounds is None and self.vertex_count > 0:
+            self._local_bounds = (self.positions.min(axis=0), self.positions.max(axis=0))
+        return self._local_bounds
+
+    def freeze(self):
+        """Make the vertex and index data read-only (used for shared / cached shapes, use clone() to get an editable copy).
+        
+        Returns:
+            Shape: Self reference for method chaining
+        """
+        for array in (self.positions, self.colours, self.normals, self.indices):
+            array.flags.writeable = False
+        return self
+
     def clone(self):
         """Create a deep copy of this shape.
         
         Returns:
             Shape: New shape with copied vertex and index data
         """
-        return Shape(
-            self.draw_type,
-            [Vertex(v.position.copy(), v.colour.copy(), v.normal.copy()) 
-             for v in self.vertices],
-            self.indices.copy(),
-            self.shader
-        )
+        return Shape.from_arrays(self.draw_type, self.positions.copy(), self.colours.copy(), self.normals.copy(), self.indices.copy(), self.shader)
 
 
 class Shapes:
@@ -267,13 +434,38 @@ class Shapes:
             else:
                 flat_shapes.append(shape)
             
-        # Group shapes by draw_type
+        # Group shapes by draw_type and combine each group in one go
         shape_list = {}
         for shape in flat_shapes:
-            if shape.draw_type not in shape_list:
-                shape_list[shape.draw_type] = Shapes.blank(shape.draw_type)
-            shape_list[shape.draw_type] += shape
-        return list(shape_list.values())    
+            shape_list.setdefault(shape.draw_type, [Shapes.blank(shape.draw_type)]).append(shape)
+        return [Shape.concat(group) for group in shape_list.values()]
+    
+    @staticmethod
+    def _outline(body, first, count, colour):
+        """Create a closed wireframe loop from the perimeter vertices of a body shape.
+        
+        Args:
+            body (Shape): Body shape the perimeter vertices are taken from
+            first (int): Index of the first perimeter vertex
+            count (int): Number of consecutive perimeter vertices
+            colour (tuple): RGB colour values of the wireframe
+        
+        Returns:
+            Shape: Line shape joining the perimeter vertices in order
+        """
+        loop = np.arange(count, dtype=np.uint32)
+        indices = np.column_stack((loop, np.roll(loop, -1)))
+        return Shape.from_arrays(GL_LINES, body.positions[first:first + count], colour, body.normals[first:first + count], indices)
+    
+    @staticmethod
+    def _from_prototype(prototype, position, colour):
+        """Create a shape from a cached prototype: copy it, set its colour and move it to position.
+        Tessellation is then only done once per distinct set of dimensions / segments."""
+        # Positions & normals are shared with the (read-only) prototype until transformed, the colour is broadcast
+        shape = Shape.from_arrays(prototype.draw_type, prototype.positions, colour, prototype.normals, prototype.indices, prototype.shader)
+        if tuple(position) != (0, 0, 0):
+            shape.transform(translate=position)
+        return shape
     
     @staticmethod
     def blank(draw_type):
@@ -306,9 +498,9 @@ class Shapes:
         Returns:
             Shape: Point shape with multiple vertices
         """
-        vertices = [Vertex(position, colour, [0, 0, 1]) for position in positions]
-        indices = list(range(len(vertices)))
-        return Shape(GL_POINTS, vertices, indices, DefaultShaders.default_point_shader)
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        indices = np.arange(len(positions), dtype=np.uint32)
+        return Shape.from_arrays(GL_POINTS, positions, colour, (0, 0, 1), indices, DefaultShaders.default_point_shader)
     
     @staticmethod
     def line(p0=(0,0,-0.5), p1=(0,0,0.5), colour=DEFAULT_LINE_COLOUR):
@@ -355,40 +547,51 @@ class Shapes:
         """
         if len(points) < 2:
             raise ValueError("Line string requires at least 2 points")
-            
-        vertices = []
-        indices = []
         
-        # Create vertices for each point
-        for i, point in enumerate(points):
-            # Skip first point as we'll handle it with pairs
-            if i == 0:
-                continue
-                
-            p0 = points[i-1]
-            p1 = point
-            
-            # Calculate normal for this segment (same as create_line)
-            direction = np.array(p1) - np.array(p0)
-            normal = np.cross(direction, [0, 0, 1])
-            norm = np.linalg.norm(normal)
-                
-            if norm > 1e-6:  # If the normal not (close to) zero
-                normal = normal / norm
-            else:  # The line is parallel to z-axis, so we can use any perpendicular vector
-                normal = np.cross(direction, [1, 0, 0])
-                normal = normal / np.linalg.norm(normal)
-            
-            # Add vertices for this segment
-            if i == 1:  # First segment needs both vertices
-                vertices.append(Vertex(p0, colour, normal))
-            vertices.append(Vertex(p1, colour, normal))
-            
-            # Add indices to connect this segment and add.object(alice's pony)
-            base_idx = i - 1
-            indices.extend([base_idx, base_idx + 1])
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+        # Normal of each segment, the first point shares the normal of the first segment and every other point the segment ending at it
+        segment_normals = Shapes._line_normals(np.diff(points, axis=0))
+        normals = np.concatenate((segment_normals[:1], segment_normals))
+        # Lines (i, i + 1)
+        segments = np.arange(len(points) - 1, dtype=np.uint32)
+        indices = np.column_stack((segments, segments + 1))
+        return Shape.from_arrays(GL_LINES, points, colour, normals, indices)
+
+    @staticmethod
+    def _line_normals(directions):
+        """Normals of line segments, as in line(): perpendicular to the segment and z, or to x if the segment is parallel to z.
         
-        return Shape(GL_LINES, vertices, indices)
+        Args:
+            directions (np.ndarray): (N, 3) direction of each segment (end - start)
+        
+        Returns:
+            np.ndarray: (N, 3) unit normals (zero for zero length segments)
+        """
+        normals = np.cross(directions, [0, 0, 1])
+        parallel = np.linalg.norm(normals, axis=1) <= 1e-6
+        normals[parallel] = np.cross(directions[parallel], [1, 0, 0])
+        norms = np.linalg.norm(normals, axis=1, keepdims=True)
+        return np.divide(normals, norms, out=normals, where=norms > 0)
+
+    @staticmethod
+    def line_segments(starts, ends, colour=DEFAULT_LINE_COLOUR):
+        """Create many separate line segments at once (vectorised, no per-line Shape).
+        
+        Args:
+            starts (np.ndarray): (N, 3) start point XYZ coordinates of each segment
+            ends (np.ndarray): (N, 3) end point XYZ coordinates of each segment
+            colour (tuple): RGB colour values
+        
+        Returns:
+            Shape: Line shape with two vertices per segment
+        """
+        starts = np.asarray(starts, dtype=np.float32).reshape(-1, 3)
+        ends = np.asarray(ends, dtype=np.float32).reshape(-1, 3)
+        normals = Shapes._line_normals(ends - starts)
+        # Interleave start / end points
+        positions = np.stack((starts, ends), axis=1).reshape(-1, 3)
+        normals = np.repeat(normals, 2, axis=0)
+        return Shape.from_arrays(GL_LINES, positions, colour, normals, np.arange(len(positions), dtype=np.uint32))
 
     @staticmethod
     def triangle(p1=(0.0, 0.5774, 0), p2=(-0.5, -0.2887, 0), p3=(0.5, -0.2887, 0), colour=DEFAULT_FACE_COLOUR, wireframe_colour=DEFAULT_WIREFRAME_COLOUR, show_body=True, show_wireframe=True):
@@ -447,7 +650,7 @@ class Shapes:
         Returns:
             Shape: Combined line segments forming triangle outline
         """
-        return Shapes.line(p1, p2, colour) + Shapes.line(p2, p3, colour) + Shapes.line(p3, p1, colour)
+        return Shape.concat([Shapes.line(p1, p2, colour), Shapes.line(p2, p3, colour), Shapes.line(p3, p1, colour)])
 
     @staticmethod
     def quad(p1, p2, p3, p4, colour=DEFAULT_FACE_COLOUR, wireframe_colour=DEFAULT_WIREFRAME_COLOUR, show_body=True, show_wireframe=True):
@@ -503,7 +706,7 @@ class Shapes:
         Returns:
             Shape: Quadrilateral wireframe shape
         """
-        return Shapes.line(p1, p2, colour) + Shapes.line(p2, p3, colour) + Shapes.line(p3, p4, colour) + Shapes.line(p4, p1, colour)
+        return Shape.concat([Shapes.line(p1, p2, colour), Shapes.line(p2, p3, colour), Shapes.line(p3, p4, colour), Shapes.line(p4, p1, colour)])
 
     @staticmethod
     def rectangle(position=(0,0,0), width=1, height=1, colour=DEFAULT_FACE_COLOUR, wireframe_colour=DEFAULT_WIREFRAME_COLOUR, show_body=True, show_wireframe=True):
@@ -521,11 +724,13 @@ class Shapes:
         Returns:
             Shape: Rectangle shape
         """
-        shapes = []
-        if show_body:
-            shapes.append(Shapes.rectangle_body(position, width, height, colour))   
+        if not show_body:
+            return [Shapes.rectangle_wireframe(position, width, height, wireframe_colour)] if show_wireframe else []
+        # Build the body once and derive the wireframe from its corners
+        body = Shapes.rectangle_body(position, width, height, colour)
+        shapes = [body]
         if show_wireframe:
-            shapes.append(Shapes.rectangle_wireframe(position, width, height, wireframe_colour))
+            shapes.append(Shapes._outline(body, 0, 4, wireframe_colour))
         return shapes
 
     @staticmethod
@@ -541,17 +746,9 @@ class Shapes:
         Returns:
             Shape: Rectangle shape in XY plane
         """
-        x, y, z = position[0], position[1], position[2]
-        half_w, half_h = width / 2, height / 2
-        normal = [0, 0, 1]
-        vertices = [
-            Vertex([x - half_w, y - half_h, z], colour, normal),
-            Vertex([x + half_w, y - half_h, z], colour, normal),
-            Vertex([x + half_w, y + half_h, z], colour, normal),
-            Vertex([x - half_w, y + half_h, z], colour, normal)
-        ]
+        positions = _UNIT_RECTANGLE * np.array((width, height, 1), dtype=np.float32) + np.asarray(position, dtype=np.float32)
         indices = [0, 1, 2, 2, 3, 0]
-        return Shape(GL_TRIANGLES, vertices, indices)
+        return Shape.from_arrays(GL_TRIANGLES, positions, colour, (0, 0, 1), indices)
 
     @staticmethod
     def rectangle_wireframe(position=(0,0,0), width=1, height=1, colour=DEFAULT_WIREFRAME_COLOUR):
@@ -566,17 +763,9 @@ class Shapes:
         Returns:
             Shape: Rectangle wireframe shape
         """
-        x, y, z = position[0], position[1], position[2]
-        half_w, half_h = width / 2, height / 2
-        normal = [0, 0, 1]  # Normal pointing outwards
-        vertices = [
-            Vertex([x - half_w, y - half_h, z], colour, normal),
-            Vertex([x + half_w, y - half_h, z], colour, normal),
-            Vertex([x + half_w, y + half_h, z], colour, normal),
-            Vertex([x - half_w, y + half_h, z], colour, normal)
-        ]
+        positions = _UNIT_RECTANGLE * np.array((width, height, 1), dtype=np.float32) + np.asarray(position, dtype=np.float32)
         indices = [0, 1, 1, 2, 2, 3, 3, 0]
-        return Shape(GL_LINES, vertices, indices)
+        return Shape.from_arrays(GL_LINES, positions, colour, (0, 0, 1), indices)
 
     @staticmethod
     def circle(position=(0,0,0), radius=0.5, segments=DEFAULT_SEGMENTS, colour=DEFAULT_FACE_COLOUR, wireframe_colour=DEFAULT_WIREFRAME_COLOUR, show_body=True, show_wireframe=True):
@@ -594,11 +783,13 @@ class Shapes:
         Returns:
             Shape: Circle shape
         """
-        shapes = []
-        if show_body:
-            shapes.append(Shapes.circle_body(position, radius, segments, colour))
+        if not show_body:
+            return [Shapes.circle_wireframe(position, radius, segments, wireframe_colour)] if show_wireframe else []
+        # Build the body once and derive the wireframe from its outer ring (vertex 0 is the centre)
+        body = Shapes.circle_body(position, radius, segments, colour)
+        shapes = [body]
         if show_wireframe:
-            shapes.append(Shapes.circle_wireframe(position, radius, segments, wireframe_colour))
+            shapes.append(Shapes._outline(body, 1, segments, wireframe_colour))
         return shapes
 
     @staticmethod
@@ -614,18 +805,18 @@ class Shapes:
         Returns:
             Shape: Circle shape made of triangular segments
         """
-        normal = [0, 0, 1]  # Normal pointing outwards
-        vertices = [Vertex(position, colour, normal)]
-        indices = []
-        for i in range(segments):
-            angle = 2 * np.pi * i / segments
-            x = position[0] + radius * np.cos(angle)
-            y = position[1] + radius * np.sin(angle)
-            vertices.append(Vertex([x, y, position[2]], colour, normal))
-            if i > 0:
-                indices.extend([0, i, i + 1])
-        indices.extend([0, segments, 1])
-        return Shape(GL_TRIANGLES, vertices, indices)
+        normal = (0, 0, 1)  # Normal pointing outwards
+        cos_table, sin_table = _ring(segments)
+        # Centre followed by the perimeter
+        positions = np.empty((segments + 1, 3), dtype=np.float32)
+        positions[0] = position
+        positions[1:, 0] = position[0] + radius * cos_table
+        positions[1:, 1] = position[1] + radius * sin_table
+        positions[1:, 2] = position[2]
+        # Fan of triangles (centre, i, i + 1), the last one closing back to the first perimeter vertex
+        perimeter = np.arange(1, segments + 1, dtype=np.uint32)
+        indices = np.column_stack((np.zeros(segments, dtype=np.uint32), perimeter, np.roll(perimeter, -1)))
+        return Shape.from_arrays(GL_TRIANGLES, positions, colour, normal, indices)
         
     @staticmethod
     def circle_wireframe(position=(0,0,0), radius=0.5, segments=DEFAULT_SEGMENTS, colour=DEFAULT_WIREFRAME_COLOUR):
@@ -640,16 +831,16 @@ class Shapes:
         Returns:
             Shape: Circle wireframe shape
         """
-        normal = [0, 0, 1]  # Normal pointing outwards
-        vertices = []
-        indices = []
-        for i in range(segments):
-            angle = 2 * np.pi * i / segments
-            x = position[0] + radius * np.cos(angle)
-            y = position[1] + radius * np.sin(angle)
-            vertices.append(Vertex([x, y, position[2]], colour, normal))
-            indices.extend([i, (i + 1) % segments])
-        return Shape(GL_LINES, vertices, indices)
+        normal = (0, 0, 1)  # Normal pointing outwards
+        cos_table, sin_table = _ring(segments)
+        positions = np.empty((segments, 3), dtype=np.float32)
+        positions[:, 0] = position[0] + radius * cos_table
+        positions[:, 1] = position[1] + radius * sin_table
+        positions[:, 2] = position[2]
+        # Lines (i, i + 1), the last one closing the loop
+        ring = np.arange(segments, dtype=np.uint32)
+        indices = np.column_stack((ring, np.roll(ring, -1)))
+        return Shape.from_arrays(GL_LINES, positions, colour, normal, indices)
 
 
     @staticmethod
@@ -686,8 +877,15 @@ class Shapes:
         Returns:
             Shape: Cube shape
         """
+        return Shapes._from_prototype(Shapes._cube_body_prototype(size), position, colour)
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _cube_body_prototype(size):
+        """Cube body centred at the origin (cached, read-only, see _from_prototype())."""
         s = size / 2.0
-        x, y, z = position
+        x, y, z = 0, 0, 0
+        colour = (1, 1, 1)
         vertices = [
             # Front face
             Vertex([x-s, y-s, z+s], colour, [0, 0, 1]),
@@ -730,7 +928,7 @@ class Shapes:
             20, 21, 22, 22, 23, 20  # Bottom face
         ]
 
-        return Shape(GL_TRIANGLES, vertices, indices)
+        return Shape(GL_TRIANGLES, vertices, indices).freeze()
 
     @staticmethod
     def cube_wireframe(position=(0,0,0), size=1.0, colour=DEFAULT_WIREFRAME_COLOUR):
@@ -801,16 +999,24 @@ class Shapes:
         Returns:
             Shape: Cylinder shape
         """
+        return Shapes._from_prototype(Shapes._cylinder_body_prototype(radius, height, segments), position, colour)
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _cylinder_body_prototype(radius, height, segments):
+        """Cylinder body centred at the origin (cached, read-only, see _from_prototype())."""
+        colour = (1, 1, 1)
         vertices = []
         indices = []
+        # Repeat the first angle to close the cylinder
+        cos_table, sin_table = _ring(segments)
+        cos_table, sin_table = np.append(cos_table, cos_table[0]), np.append(sin_table, sin_table[0])
 
         # Create vertices for the cylinder body
         for i in range(segments + 1):  # +1 to close the cylinder
-            angle = 2 * np.pi * i / segments
-            x = radius * np.cos(angle)
-            y = radius * np.sin(angle)
-            normal = np.array([x, y, 0])
-            normal = normal / np.linalg.norm(normal)  # Normalize the normal
+            x = radius * cos_table[i]
+            y = radius * sin_table[i]
+            normal = [cos_table[i], sin_table[i], 0]  # Unit normal pointing outwards
             
             # Bottom vertex
             vertices.append(Vertex([x, y, -height/2], colour, normal))
@@ -830,11 +1036,7 @@ class Shapes:
         # Bottom and top circle bodies + wireframes
         bottom = Shapes.circle_body(position=(0,0,height/2), radius=radius, segments=segments, colour=colour).transform(rotate=(np.pi,0,0))
         top = Shapes.circle_body(position=(0,0,height/2), radius=radius, segments=segments, colour=colour)
-        body = cylinder + bottom + top
-        # Transform to position
-        if position != (0,0,0):
-            body.transform(translate=position)
-        return body
+        return Shape.concat([cylinder, bottom, top]).freeze()
     
     @staticmethod
     def cylinder_wireframe(position=(0,0,0), radius=0.5, height=1.0, segments=DEFAULT_SEGMENTS, colour=DEFAULT_WIREFRAME_COLOUR):
@@ -902,7 +1104,7 @@ class Shapes:
         side_1 = Shapes.quad_body(p1+z, p1-z, p2-z, p2+z, colour)
         side_2 = Shapes.quad_body(p2+z, p2-z, p3-z, p3+z, colour)
         side_3 = Shapes.quad_body(p3+z, p3-z, p1-z, p1+z, colour)
-        return (top + bottom + side_1 + side_2 + side_3).transform(translate=position)
+        return Shape.concat([top, bottom, side_1, side_2, side_3]).transform(translate=position)
     
     @staticmethod
     def prism_wireframe(position=(0,0,0), radius=0.5, depth=1, colour=DEFAULT_WIREFRAME_COLOUR):
@@ -925,7 +1127,7 @@ class Shapes:
         line_1 = Shapes.line(p1+z, p1-z, colour) 
         line_2 = Shapes.line(p2+z, p2-z, colour)
         line_3 = Shapes.line(p3+z, p3-z, colour)
-        return (top + bottom + line_1 + line_2 + line_3).transform(translate=position)
+        return Shape.concat([top, bottom, line_1, line_2, line_3]).transform(translate=position)
     
     @staticmethod
     def cone(position=(0,0,0), radius=0.5, height=1.0, segments=DEFAULT_SEGMENTS, colour=DEFAULT_FACE_COLOUR, wireframe_colour=DEFAULT_WIREFRAME_COLOUR, show_body=True, show_wireframe=True):
@@ -967,17 +1169,23 @@ class Shapes:
         """
         assert isinstance(segments, int) and segments > 2, "segments must be an integer greater than 2"
         assert len(colour) == 3, "colour must be a tuple of 3 values"
-        
+        return Shapes._from_prototype(Shapes._cone_body_prototype(radius, height, segments), position, colour)
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _cone_body_prototype(radius, height, segments):
+        """Cone body centred at the origin (cached, read-only, see _from_prototype())."""
+        colour = (1, 1, 1)
         vertices = []
         indices = []
         normal_apex = [0, 0, 1]  # Normal pointing outwards
         # Apex
         vertices.append(Vertex([0, 0, height/2], colour, normal_apex))
         # Side vertices
+        cos_table, sin_table = _ring(segments)
         for i in range(segments):
-            angle = 2 * np.pi * i / segments
-            x = radius * np.cos(angle)
-            y = radius * np.sin(angle)
+            x = radius * cos_table[i]
+            y = radius * sin_table[i]
             normal = [x, y, 0.5]  # Adjusted normal for smooth shading
             normal = normal / np.linalg.norm(normal)
             vertices.append(Vertex([x, y, -height/2], colour, normal))
@@ -991,11 +1199,7 @@ class Shapes:
         cone = Shape(GL_TRIANGLES, vertices, indices)
         # Create bottom circle
         base_circle = Shapes.circle_body(segments=segments, colour=colour).transform(translate=(0,0,-0.5), rotate=(np.pi,0,0))
-        body = cone + base_circle
-        # Transform to position
-        if position != (0,0,0):
-            body.transform(translate=position)
-        return body
+        return (cone + base_circle).freeze()
 
     @staticmethod
     def cone_wireframe(position=(0,0,0), radius=0.5, segments=DEFAULT_SEGMENTS, colour=DEFAULT_WIREFRAME_COLOUR):
@@ -1028,6 +1232,13 @@ class Shapes:
         Returns:
             Shape: Sphere shape with normalized vertices
         """
+        return Shapes._from_prototype(Shapes._sphere_prototype(radius, subdivisions), position, colour)
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _sphere_prototype(radius, subdivisions):
+        """Sphere centred at the origin (cached, read-only, see _from_prototype())."""
+        colour = (1, 1, 1)
         
         def normalize(v):
             # Normalize a vector to unit length
@@ -1079,10 +1290,7 @@ class Shapes:
             vertex_position = [x * radius for x in normalized]
             vertex_objects.append(Vertex(vertex_position, colour, normalized))
 
-        sphere = Shape(GL_TRIANGLES, vertex_objects, indices)
-        if position != (0,0,0):
-            sphere.transform(translate=position)
-        return sphere
+        return Shape(GL_TRIANGLES, vertex_objects, indices).freeze()
     
     @staticmethod
     def grid(size, increment, colour=DEFAULT_LINE_COLOUR):
@@ -1096,23 +1304,21 @@ class Shapes:
         Returns:
             Shape: Grid shape with line segments
         """
-        vertices = []
-        indices = []
         num_lines = int(size / increment) + 1
+        half_size = size / 2
+        coords = np.arange(num_lines, dtype=np.float32) * increment - half_size
         
-        for i in range(num_lines):
-            x = i * increment - size/2
-            vertices.append(Vertex([x, -size/2, 0], colour, [0, 0, 1]))
-            vertices.append(Vertex([x, size/2, 0], colour, [0, 0, 1]))
-            
-            y = i * increment - size/2
-            vertices.append(Vertex([-size/2, y, 0], colour, [0, 0, 1]))
-            vertices.append(Vertex([size/2, y, 0], colour, [0, 0, 1]))
-            
-            index = i * 4
-            indices.extend([index, index + 1, index + 2, index + 3])
-
-        return Shape(GL_LINES, vertices, indices)
+        # 4 vertices per grid line index: a line along y at x = coord, then a line along x at y = coord
+        positions = np.zeros((num_lines, 4, 3), dtype=np.float32)
+        positions[:, 0:2, 0] = coords[:, None]
+        positions[:, 0, 1] = -half_size
+        positions[:, 1, 1] = half_size
+        positions[:, 2, 0] = -half_size
+        positions[:, 3, 0] = half_size
+        positions[:, 2:4, 1] = coords[:, None]
+        
+        indices = np.arange(num_lines * 4, dtype=np.uint32)
+        return Shape.from_arrays(GL_LINES, positions, colour, (0, 0, 1), indices)
 
     # # TODO: Move to grid class
     # def add_grid(self, size=5.0, grid_params=None, params = RenderParams()):
@@ -1256,22 +1462,30 @@ class Shapes:
             X coordinates
         y : float or array-like
             Y coordinates
-        colour : Colour, optional
-            Point colour
+        colour : Colour or np.ndarray, optional
+            Point colour, or (N, 3) colour of each point (floats 0-1, or 8-bit integers 0-255)
 
         Returns
         -------
             Shape: 2D (XY) points
         """
-        x = np.atleast_1d(x)
-        y = np.atleast_1d(y)
+        # Flat views of the inputs (no copy for contiguous arrays)
+        x = np.asarray(x).reshape(-1)
+        y = np.asarray(y).reshape(-1)
         
         if len(x) != len(y):
             raise ValueError("x and y must have same length")
-        points = np.column_stack((x, y, np.zeros_like(x)))
+        # Fill the float32 positions directly (z = 0), a single vertex array for all points
+        positions = np.empty((len(x), 3), dtype=np.float32)
+        positions[:, 0] = x
+        positions[:, 1] = y
+        positions[:, 2] = 0.0
+        # Per-point colours given as 8-bit integers
+        if isinstance(colour, np.ndarray) and colour.dtype.kind in 'ui':
+            colour = Colour.rgb_array(colour)
         
         # Use point shader if not specified
-        return Shapes.points(points, colour)
+        return Shapes.points(positions, colour)
 
     @staticmethod
     def plot(x, y, colour=DEFAULT_LINE_COLOUR):
@@ -1283,8 +1497,8 @@ class Shapes:
             X coordinates
         y : float or array-like
             Y coordinates
-        colour : Colour, optional
-            Line colour (default: white)
+        colour : Colour or np.ndarray, optional
+            Line colour (default: white), or (N, 3) colour at each point (floats 0-1, or 8-bit integers 0-255)
         params : RenderParams, optional
             Rendering parameters
 
@@ -1292,14 +1506,20 @@ class Shapes:
         -------
             Shape: 2D (XY) lines
         """
-        x = np.atleast_1d(x)
-        y = np.atleast_1d(y)
+        x = np.asarray(x).reshape(-1)
+        y = np.asarray(y).reshape(-1)
         
         if len(x) != len(y):
             raise ValueError("x and y must have same length")
         
-        points = np.column_stack((x, y, np.zeros_like(x)))
-        return Shapes.linestring(points, colour)
+        positions = np.empty((len(x), 3), dtype=np.float32)
+        positions[:, 0] = x
+        positions[:, 1] = y
+        positions[:, 2] = 0.0
+        # Per-point colours given as 8-bit integers
+        if isinstance(colour, np.ndarray) and colour.dtype.kind in 'ui':
+            colour = Colour.rgb_array(colour)
+        return Shapes.linestring(positions, colour)
     
     ###########################################################################
     ###########  MULTIPLE GEOMETRIES  #########################################
@@ -1364,6 +1584,133 @@ class Shapes:
         Returns:
             list[Shape]: [Filled arrow shape, Wireframe shape]
         """
+        return Shapes.arrows([p0], [p1], dimensions, colour, wireframe_colour, segments, show_body, show_wireframe)
+    
+    @staticmethod
+    def arrows(p0s, p1s, dimensions=DEFAULT_ARROW_DIMENSIONS, colours=DEFAULT_FACE_COLOUR, wireframe_colour=DEFAULT_WIREFRAME_COLOUR, segments=DEFAULT_SEGMENTS, show_body=True, show_wireframe=True):
+        """Create several 3D arrows at once, combined into a single body and a single wireframe shape.
+        The shaft and head geometry is cached per segment count (see _arrow_prototype()) and transformed into place
+        for every arrow in one batched operation.
+        
+        Args:
+            p0s (np.ndarray): (K, 3) start points of each arrow
+            p1s (np.ndarray): (K, 3) end points of each arrow
+            dimensions (ArrowDimensions): Arrow dimensions (shaft_radius, head_radius, head_length)
+            colours (np.ndarray): (K, 3) RGB colour of each arrow body, or a single RGB colour for every arrow
+            wireframe_colour (tuple): RGB colour values for wireframe
+            segments (int): Number of segments for circular parts. Defaults to 16
+            show_body (bool): Whether to show the body of the arrows
+            show_wireframe (bool): Whether to show the wireframe of the arrows
+
+        Returns:
+            list[Shape]: [Filled arrows shape, Wireframe shape]
+        """
+        p0s = np.asarray(p0s, dtype=float).reshape(-1, 3)
+        p1s = np.asarray(p1s, dtype=float).reshape(-1, 3)
+        colours = np.broadcast_to(np.asarray(colours, dtype=np.float32), (len(p0s), 3))
+        
+        # Skip arrows where p0 and p1 are the same
+        direction = p1s - p0s
+        lengths = np.linalg.norm(direction, axis=1)
+        valid = lengths > 0
+        if not np.any(valid):
+            return [Shape(GL_TRIANGLES), Shape(GL_LINES)]  # Return empty shape if p0 and p1 are the same
+        p0s, p1s, colours = p0s[valid], p1s[valid], colours[valid]
+        heads = p1s - direction[valid] / lengths[valid, None] * dimensions.head_length
+        
+        # A zero length shaft or head (e.g. zero head length) has a singular transform so its normals can't be transformed,
+        # build those arrows separately, as Shapes._arrow() leaves such parts untransformed
+        degenerate = ~(np.linalg.norm(heads - p0s, axis=1) > 0) | ~(np.linalg.norm(p1s - heads, axis=1) > 0)
+        if np.any(degenerate):
+            return Shapes.combine([Shapes._arrow(p0, p1, dimensions, colour, wireframe_colour, segments, show_body, show_wireframe) for p0, p1, colour in zip(p0s, p1s, colours)])
+
+        # Calculate transforms
+        shaft_matrices = Shapes._span_matrices(p0s, heads, (dimensions.shaft_radius, dimensions.shaft_radius))
+        head_matrices = Shapes._span_matrices(heads, p1s, (dimensions.head_radius, dimensions.head_radius))
+
+        body_parts, wireframe_parts = Shapes._arrow_prototype(segments)
+        shapes = []
+        if show_body:
+            body = Shapes._place_copies(body_parts, [shaft_matrices, head_matrices])
+            body.colours = np.repeat(colours, body.vertex_count // len(p0s), axis=0)
+            shapes.append(body)
+        if show_wireframe:
+            wireframe = Shapes._place_copies(wireframe_parts, [shaft_matrices, head_matrices])
+            wireframe.colours = np.broadcast_to(np.asarray(wireframe_colour, dtype=np.float32), wireframe.positions.shape)
+            shapes.append(wireframe)
+        return shapes
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _arrow_prototype(segments):
+        """Unit (white) shaft and head parts of an arrow, cached per segment count. Placed and coloured by Shapes.arrows().
+        
+        Returns:
+            tuple: ([shaft body, head body], [shaft wireframe, head wireframe]) read-only shapes
+        """
+        body_parts = [Shapes.cylinder_body(segments=segments, colour=(1, 1, 1)).freeze(), Shapes.cone_body(segments=segments, colour=(1, 1, 1)).freeze()]
+        wireframe_parts = [Shapes.cylinder_wireframe(segments=segments, colour=(1, 1, 1)).freeze(), Shapes.cone_wireframe(segments=segments, colour=(1, 1, 1)).freeze()]
+        return body_parts, wireframe_parts
+
+    @staticmethod
+    def _span_matrices(p0s, p1s, cross_section):
+        """Batched equivalent of Shapes.calculate_transform(p0, p1, cross_section).transform_matrix() for each pair of points.
+        
+        Args:
+            p0s (np.ndarray): (K, 3) start points
+            p1s (np.ndarray): (K, 3) end points
+            cross_section (tuple): XY scale factors
+        
+        Returns:
+            np.ndarray: (K, 4, 4) float32 transform matrices, unrotated with a zero Z scale where p0 == p1 (as calculate_transform())
+        """
+        direction = p1s - p0s
+        length = np.linalg.norm(direction, axis=1)
+        # Zero length spans point along +Z, so they get no rotation
+        unit = np.divide(direction, length[:, None], out=np.tile(np.array([0.0, 0.0, 1.0]), (len(length), 1)), where=length[:, None] > 0)
+        # Yaw (around Z) then pitch (around Y) to align +Z to the direction, as calculate_transform()
+        rz = np.arctan2(unit[:, 1], unit[:, 0]).astype(np.float32)
+        ry = np.arctan2(np.sqrt(unit[:, 0]**2 + unit[:, 1]**2), unit[:, 2]).astype(np.float32)
+        cz, sz, cy, sy = np.cos(rz), np.sin(rz), np.cos(ry), np.sin(ry)
+        # Rz @ Ry, with each column scaled by (cross_section[1], cross_section[0], length)
+        scale_x, scale_y, scale_z = np.float32(cross_section[1]), np.float32(cross_section[0]), length.astype(np.float32)
+        matrices = np.zeros((len(p0s), 4, 4), dtype=np.float32)
+        matrices[:, 0, 0], matrices[:, 0, 1], matrices[:, 0, 2] = (cz * cy) * scale_x, -sz * scale_y, (cz * sy) * scale_z
+        matrices[:, 1, 0], matrices[:, 1, 1], matrices[:, 1, 2] = (sz * cy) * scale_x, cz * scale_y, (sz * sy) * scale_z
+        matrices[:, 2, 0], matrices[:, 2, 2] = -sy * scale_x, cy * scale_z
+        # Translate to the midpoint
+        matrices[:, :3, 3] = (p0s + p1s) / 2
+        matrices[:, 3, 3] = 1
+        return matrices
+
+    @staticmethod
+    def _place_copies(parts, matrices):
+        """Transform a copy of each part by each of its (K, 4, 4) matrices and combine them into one shape,
+        ordered by copy then part (i.e. [part0, part1, ...] for copy 0, then for copy 1, ...).
+        The matrices must not be singular, as normals are transformed by their inverse transpose.
+        """
+        positions, colours, normals = [], [], []
+        for part, part_matrices in zip(parts, matrices):
+            rotation_scale = part_matrices[:, :3, :3]
+            normal_matrices = np.linalg.inv(rotation_scale).transpose(0, 2, 1)
+            positions.append(np.einsum('kij,vj->kvi', rotation_scale, part.positions) + part_matrices[:, None, :3, 3])
+            colours.append(np.broadcast_to(part.colours, (len(part_matrices),) + part.colours.shape))
+            part_normals = np.einsum('kij,vj->kvi', normal_matrices, part.normals)
+            normals.append(part_normals / np.linalg.norm(part_normals, axis=2, keepdims=True))
+        # (K, V, 3) arrays, V being the total vertices of all parts
+        positions, colours, normals = (np.concatenate(arrays, axis=1) for arrays in (positions, colours, normals))
+        copies, vertices_per_copy = positions.shape[0], positions.shape[1]
+        
+        # Offset the indices of each part within a copy, then of each copy
+        part_offsets = np.cumsum([0] + [part.vertex_count for part in parts[:-1]])
+        copy_indices = np.concatenate([part.indices.astype(np.uint32) + offset for part, offset in zip(parts, part_offsets)])
+        copy_offsets = np.arange(copies, dtype=np.uint32)[:, None] * vertices_per_copy
+        indices = (copy_indices[None, :] + copy_offsets).reshape(-1)
+        return Shape.from_arrays(parts[0].draw_type, positions.reshape(-1, 3), colours.reshape(-1, 3), normals.reshape(-1, 3), indices, parts[0].shader)
+    
+    @staticmethod
+    def _arrow(p0, p1, dimensions, colour, wireframe_colour, segments, show_body, show_wireframe):
+        """Create a single arrow, transforming the shaft and head individually."""
         p0, p1 = np.array(p0), np.array(p1)
         direction = p1 - p0
         length = np.linalg.norm(direction)
@@ -1435,10 +1782,10 @@ class Shapes:
         list[Shape]
             Collection containing 'body' and 'wireframe' shapes
         """
+        # X, Y & Z arrows (coloured red, green & blue) built in a single batch
+        directions = np.identity(3) * size
         return Shapes.combine([
-            Shapes.arrow((0,0,0), (size,0,0), arrow_dimensions, (1,0,0), wireframe_colour, segments),
-            Shapes.arrow((0,0,0), (0,size,0), arrow_dimensions, (0,1,0), wireframe_colour, segments),
-            Shapes.arrow((0,0,0), (0,0,size), arrow_dimensions, (0,0,1), wireframe_colour, segments),
+            Shapes.arrows(np.zeros((3, 3)), directions, arrow_dimensions, np.identity(3), wireframe_colour, segments, show_body, show_wireframe),
             Shapes.sphere(position=(0,0,0), radius=origin_radius, subdivisions=subdivisions, colour=origin_colour)
         ])
 
@@ -1468,22 +1815,18 @@ class Shapes:
             tick_size = tick_level['tick_size']
             # line_width = tick_level['line_width'] # TODO: add line width
             tick_colour = tick_level['tick_colour']
-            tick_shape = None
             
-            for i in np.arange(-size + increment, size + increment/2, increment):
-                if abs(i) < 1e-10:  # Skip centre
-                    continue
-                    
-                x_tick = Shapes.line((i, 0, 0), (i, tick_size, 0), tick_colour)
-                y_tick = Shapes.line((0, i, 0), (tick_size, i, 0), tick_colour)
-                
-                if tick_shape is None:
-                    tick_shape = x_tick + y_tick
-                else:
-                    tick_shape = tick_shape + x_tick + y_tick
-
-            if tick_shape is not None:
-                shapes.append(tick_shape)
+            values = np.arange(-size + increment, size + increment/2, increment)
+            values = values[np.abs(values) >= 1e-10]  # Skip centre
+            if len(values) == 0:
+                continue
+            
+            # An x tick and a y tick for each value, both built in one go
+            zeros = np.zeros_like(values)
+            sizes = np.full_like(values, tick_size)
+            starts = np.stack((np.column_stack((values, zeros, zeros)), np.column_stack((zeros, values, zeros))), axis=1)
+            ends = np.stack((np.column_stack((values, sizes, zeros)), np.column_stack((sizes, values, zeros))), axis=1)
+            shapes.append(Shapes.line_segments(starts, ends, tick_colour))
                 
         return shapes
     
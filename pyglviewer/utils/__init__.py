@@ -1,11 +1,12 @@
 from .colour import Colour
 from .config import Config
 from .timer import Timer
-from .transform import Transform
+from .transform import Transform, TransformPool
 
 __all__ = [
     "Colour",
     "Config",
     "Timer",
     "Transform",
+    "TransformPool",
 ]
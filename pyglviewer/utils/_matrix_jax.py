@@ -0,0 +1,54 @@
+"""
+Optional JAX kernel for building many Transform matrices at once (see transform.build_matrices()), on the GPU if
+JAX has one. JAX is an optional dependency (pip install pyglviewer[jax]), if it is not installed
+JAX_AVAILABLE is False and build_matrices() uses NumPy.
+JAX is slow to import, so it is only imported (and the kernel compiled) the first time a batch is large enough.
+"""
+from importlib.util import find_spec
+
+JAX_AVAILABLE = find_spec('jax') is not None
+
+# Below this many matrices, the transfer to / from the device costs more than it saves, so NumPy is used
+MIN_JAX_MATRICES = 10_000
+
+_build_matrices_jit = None
+
+
+def _compile():
+    """Import JAX and return the jitted kernel."""
+    import jax
+    import jax.numpy as jnp
+
+    @jax.jit
+    def build(translates, rotates, scales):
+        cx, cy, cz = jnp.cos(rotates).T
+        sx, sy, sz = jnp.sin(rotates).T
+        scale_x, scale_y, scale_z = scales.T
+        tx, ty, tz = translates.T
+        zeros, ones = jnp.zeros_like(cx), jnp.ones_like(cx)
+        rows = (
+            (cz * cy * scale_x, (cz * sy * sx - sz * cx) * scale_y, (cz * sy * cx + sz * sx) * scale_z, tx),
+            (sz * cy * scale_x, (sz * sy * sx + cz * cx) * scale_y, (sz * sy * cx - cz * sx) * scale_z, ty),
+            (-sy * scale_x, cy * sx * scale_y, cy * cx * scale_z, tz),
+            (zeros, zeros, zeros, ones),
+        )
+        return jnp.stack([jnp.stack(row, axis=-1) for row in rows], axis=-2)
+
+    return build
+
+
+def build_matrices(translates, rotates, scales):
+    """Build the 4x4 matrices translate * Rz * Ry * Rx * scale, as transform.build_matrices().
+
+    Args:
+        translates (np.ndarray): (N, 3) float32 translations
+        rotates (np.ndarray): (N, 3) float32 XYZ rotation angles in radians
+        scales (np.ndarray): (N, 3) float32 XYZ scale factors
+
+    Returns:
+        jax.Array: (N, 4, 4) float32 transformation matrices
+    """
+    global _build_matrices_jit
+    if _build_matrices_jit is None:
+        _build_matrices_jit = _compile()
+    return _build_matrices_jit(translates, rotates, scales)
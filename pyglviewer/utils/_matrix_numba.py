@@ -0,0 +1,51 @@
+"""
+Optional Numba kernel for building Transform matrices.
+Numba is an optional dependency (pip install pyglviewer[accelerated]), if it is not installed
+NUMBA_AVAILABLE is False and Transform falls back to NumPy.
+This is the compiled path for building a single transform's matrix, Numba is used rather than a C extension so
+the package stays pure Python and doesn't need a compiler to install.
+"""
+import math
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+NUMBA_AVAILABLE = numba is not None
+
+
+if NUMBA_AVAILABLE:
+    # Explicit signature: compiled (or loaded from the cache) once at import, rather than on the first call
+    @numba.njit('void(f4[:], f4[:], f4[:], f4[:, :])', cache=True, fastmath=True)
+    def build_trs(translate, rotate, scale, out):
+        """Write the 4x4 matrix translate * Rz * Ry * Rx * scale into out, in closed form (no temporary arrays).
+
+        Args:
+            translate (np.ndarray): (3,) float32 translation
+            rotate (np.ndarray): (3,) float32 XYZ rotation angles in radians
+            scale (np.ndarray): (3,) float32 XYZ scale factors
+            out (np.ndarray): (4, 4) float32 output matrix
+        """
+        cx, cy, cz = math.cos(rotate[0]), math.cos(rotate[1]), math.cos(rotate[2])
+        sx, sy, sz = math.sin(rotate[0]), math.sin(rotate[1]), math.sin(rotate[2])
+        # Rz @ Ry @ Rx, each column multiplied by its scale
+        out[0, 0] = cz * cy * scale[0]
+        out[0, 1] = (cz * sy * sx - sz * cx) * scale[1]
+        out[0, 2] = (cz * sy * cx + sz * sx) * scale[2]
+        out[1, 0] = sz * cy * scale[0]
+        out[1, 1] = (sz * sy * sx + cz * cx) * scale[1]
+        out[1, 2] = (sz * sy * cx - cz * sx) * scale[2]
+        out[2, 0] = -sy * scale[0]
+        out[2, 1] = cy * sx * scale[1]
+        out[2, 2] = cy * cx * scale[2]
+        # Translation in the last column
+        out[0, 3] = translate[0]
+        out[1, 3] = translate[1]
+        out[2, 3] = translate[2]
+        out[3, 0] = 0
+        out[3, 1] = 0
+        out[3, 2] = 0
+        out[3, 3] = 1
+else:
+    build_trs = None
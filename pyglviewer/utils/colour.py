@@ -1,3 +1,9 @@
+import numpy as np
+
+# Scale from 8-bit to normalized colour values
+_INV_255 = np.float32(1.0 / 255.0)
+
+
 class Colour:
     """Common colour constants."""
     BLACK = (0.0, 0.0, 0.0)
@@ -43,6 +49,18 @@ class Colour:
         """
         return (r / 255.0, g / 255.0, b / 255.0, a / 255.0)
 
+    @staticmethod
+    def rgb_array(colours):
+        """Convert an array of 8-bit RGB (or RGBA) values to normalized floats, in a single vectorized pass.
+        
+        Args:
+            colours (array-like): (N, 3) or (N, 4) colour values (0-255), e.g. a uint8 array
+        
+        Returns:
+            np.ndarray: float32 array of normalized colour values (0.0-1.0), with the same shape
+        """
+        return np.asarray(colours, dtype=np.float32) * _INV_255
+
     @staticmethod
     def interpolate(colour_1, colour_2, t):
         """Linearly interpolate between two colours.
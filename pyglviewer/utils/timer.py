@@ -1,33 +1,75 @@
-import glfw
-import numpy as np
+import math
+from time import perf_counter
+
+_TWO_PI = 2.0 * math.pi
 
 class Timer:
-    """Simple timer for tracking frame times using ImGui."""
+    """Simple timer for tracking frame times."""
+    start = perf_counter()  # Times are measured from when the module is imported (around when the window is created)
     previous = 0.0
     time = 0.0
     dt = 0.0
 
+    def __init__(self):
+        # Oscillators (see register_oscillator()), the function returned for each -> [speed, sine table, current value]
+        self._oscillators = {}
+
     def update(self):
         """Update timer and calculate delta time between frames."""
-        self.time = glfw.get_time()
+        self.time = perf_counter() - Timer.start
         self.dt = self.time - self.previous
         self.previous = self.time
+        # Look up each oscillator's value once per frame, shared by everything that uses it
+        for oscillator in self._oscillators.values():
+            speed, table, _ = oscillator
+            oscillator[2] = table[int(self.time * speed * len(table)) % len(table)]
+
+    def register_oscillator(self, speed=1, samples=256):
+        """Create a sine oscillator at a fixed speed, sampled from a precomputed table once per frame.
+
+        Useful when many objects oscillate at a few speeds, as reading the value doesn't calculate anything.
+        Remove it with unregister_oscillator() when it is no longer used.
+        
+        Args:
+            speed (float): Oscillations per second (default: 1)
+            samples (int): Number of samples per oscillation (default: 256)
+            
+        Returns:
+            callable: Function returning the current value of sin(2π * speed * time), between -1 and 1
+        """
+        table = [math.sin(_TWO_PI * i / samples) for i in range(samples)]
+        oscillator = [speed, table, table[int(self.time * speed * samples) % samples]]
+        value = lambda: oscillator[2]
+        self._oscillators[value] = oscillator
+        return value
+
+    def unregister_oscillator(self, oscillator):
+        """Stop updating an oscillator, releasing its table.
+        
+        Args:
+            oscillator (callable): Function returned by register_oscillator()
+        """
+        self._oscillators.pop(oscillator, None)
         
-    def oscillate_angle(self, speed=1, offset=0, reverse=False):
+    def oscillate_angle(self, speed=1, offset=0, reverse=False, direction=1):
         """Calculate rotation angle for continuous rotation (2π per second).
         
         Args:
             speed (float): Rotation speed multiplier (default: 1)
             offset (float): Phase offset in radians (default: 0)
             reverse (bool): Reverse rotation direction (default: False)
+            direction (int): Rotation direction, 1 or -1 (default: 1), -1 is the same as reverse=True
             
         Returns:
             float: Angle in radians, wrapped between 0 and 2π
         """
-        angle = (speed * self.time * 2 * np.pi + offset) 
-        return angle if reverse else 2 * np.pi - angle
+        # Python floats and math functions, rather than numpy scalars, as this is called per object every frame
+        direction *= 1 - 2 * reverse
+        angle = (speed * self.time * _TWO_PI + offset) 
+        # 2π - angle forwards, angle in reverse, without branching
+        return (1 + direction) * math.pi - direction * angle
     
-    def oscillate_translation(self, limits=[-1, 1], speed=1, offset=0, reverse=False):
+    def oscillate_translation(self, limits=[-1, 1], speed=1, offset=0, reverse=False, direction=1):
         """Calculate sinusoidal translation (1 oscillation per second).
         
         Args:
@@ -35,10 +77,15 @@ class Timer:
             speed (float): Speed of oscillation
             offset (float): Phase offset in radians (default: 0)
             reverse (bool): Reverse oscillation direction (default: False)
+            direction (int): Oscillation direction, 1 or -1 (default: 1), -1 is the same as reverse=True
             
         Returns:
             float: Translation offset between between[0] and between[1]
         """
-        amplitude = (limits[1] - limits[0]) / 2
-        offset = (limits[0] + limits[1]) / 2
-        return amplitude * np.sin(speed * self.oscillate_angle(offset=offset, reverse=reverse)) + offset
\ No newline at end of file
+        low, high = limits
+        amplitude = (high - low) / 2
+        offset = (low + high) / 2
+        # oscillate_angle() inlined, called per object every frame
+        direction *= 1 - 2 * reverse
+        angle = (1 + direction) * math.pi - direction * (self.time * _TWO_PI + offset)
+        return amplitude * math.sin(speed * angle) + offset
\ No newline at end of file
@@ -1,89 +1,393 @@
+import math
 import numpy as np
+from pyglviewer.utils import _matrix_numba, _matrix_jax
 
 class Transform:
-    """Handles 3D transformations including translation, rotation, and scaling."""
-    def __init__(self, translate=(0, 0, 0), rotate=(0, 0, 0), scale=(1, 1, 1)):
+    """Handles 3D transformations including translation, rotation, and scaling.
+
+    Transforms can optionally be attached to a parent transform (see set_parent()), in which case world_matrix()
+    returns the combined parent * child matrix. World matrices are cached and only recalculated when the transform
+    or one of its parents changes, so static parts of a hierarchy cost nothing per frame.
+
+    Rotations are XYZ Euler angles, unless a quaternion is set (see set_quaternion() and rotate_about()), which
+    suits rotations that are composed incrementally, as they don't need any sines / cosines to build the matrix.
+
+    With cache=False no matrices are stored, they are built each time they are requested. This makes the transform
+    smaller, for large numbers of short-lived transforms whose matrices are only read once.
+    """
+    def __init__(self, translate=(0, 0, 0), rotate=(0, 0, 0), scale=(1, 1, 1), parent=None, cache=True):
         self.translate = np.array(translate, dtype=np.float32)
         self.rotate = np.array(rotate, dtype=np.float32)  # In radians
         self.scale = np.array(scale, dtype=np.float32)
+        # Unit quaternion (w, x, y, z), used instead of rotate when set
+        self.quaternion = None
         self.needs_update = True
-        self.cached_matrix = None
+        # Set when only the translation has changed, so the rotation / scale part of the matrix is kept
+        self.translate_needs_update = False
+        # Hierarchy (optional)
+        self.parent = None
+        self.children = []
+        self._world_needs_update = True
+        if cache:
+            # Preallocated matrices, rewritten in place when the transform changes (the bottom row never changes)
+            self.cached_matrix = np.zeros((4, 4), dtype=np.float32)
+            self.cached_matrix[3, 3] = 1
+            self._world_matrix = np.zeros((4, 4), dtype=np.float32)
+            # Read-only views returned to callers, so the shared buffers can't be modified by accident
+            self._matrix_view = self.cached_matrix.view()
+            self._matrix_view.flags.writeable = False
+            self._world_matrix_view = self._world_matrix.view()
+            self._world_matrix_view.flags.writeable = False
+        else:
+            self.cached_matrix = None
+        if parent is not None:
+            self.set_parent(parent)
         
-    def transform_position(self, position):
+    def transform_position(self, position, out=None):
         """Transform a 3D position using this transform.
         
         Args:
             position (np.array): 3D position vector
+            out (np.array, optional): (3,) float32 array to write the result into, avoids allocating one per call
             
         Returns:
             np.array: Transformed position
         """
-        return (self.transform_matrix() @ np.append(position, 1))[:3]
+        matrix = self.transform_matrix()
+        # Rotation / scale then translation, rather than a 4x4 product with a homogeneous (x, y, z, 1) vector
+        out = np.matmul(matrix[:3, :3], np.asarray(position, dtype=np.float32), out=out)
+        out += matrix[:3, 3]
+        return out
+
+    def transform_positions(self, positions, out=None):
+        """Transform many 3D positions at once using this transform.
+        
+        Args:
+            positions (np.array): (N, 3) position vectors
+            out (np.array, optional): (N, 3) float32 array to write the results into
+            
+        Returns:
+            np.array: (N, 3) transformed positions
+        """
+        matrix = self.transform_matrix()
+        # Row vectors, so multiply by the transposed rotation / scale block
+        out = np.matmul(np.asarray(positions, dtype=np.float32).reshape(-1, 3), matrix[:3, :3].T, out=out)
+        out += matrix[:3, 3]
+        return out
 
     def transform_matrix(self):
         """Create a 4x4 transformation matrix.
         
         Returns:
-            np.array: 4x4 transformation matrix
+            np.array: Read-only 4x4 transformation matrix. This is updated in place when the transform changes, copy it to keep it
+                (a new writable matrix if the transform is uncached)
         """
+        if self.cached_matrix is None:
+            # Uncached, build a new matrix every time
+            matrix = np.zeros((4, 4), dtype=np.float32)
+            matrix[3, 3] = 1
+            self._build_matrix(matrix)
+            return matrix
         if self.needs_update:
-            tx, ty, tz = self.translate
-            rx, ry, rz = self.rotate
-            sx, sy, sz = self.scale
-
-            # Create rotation matrices
-            Rx = np.array([[1, 0, 0], [0, np.cos(rx), -np.sin(rx)], [0, np.sin(rx), np.cos(rx)]])
-            Ry = np.array([[np.cos(ry), 0, np.sin(ry)], [0, 1, 0], [-np.sin(ry), 0, np.cos(ry)]])
-            Rz = np.array([[np.cos(rz), -np.sin(rz), 0], [np.sin(rz), np.cos(rz), 0], [0, 0, 1]])
-
-            # Combine rotations
-            R = Rz @ Ry @ Rx
-
-            # Create transformation matrix
-            transform = np.array([
-                [R[0, 0]*sx, R[0, 1]*sy, R[0, 2]*sz, tx],
-                [R[1, 0]*sx, R[1, 1]*sy, R[1, 2]*sz, ty],
-                [R[2, 0]*sx, R[2, 1]*sy, R[2, 2]*sz, tz],
-                [0, 0, 0, 1]
-            ], dtype=np.float32)  # Ensure float32 type
-
+            self._build_matrix(self.cached_matrix)
             self.needs_update = False
-            self.cached_matrix = transform
+            self.translate_needs_update = False
+        elif self.translate_needs_update:
+            # Only the translation column has changed, skips the sines / cosines
+            self.cached_matrix[:3, 3] = self.translate
+            self.translate_needs_update = False
             
-        return self.cached_matrix
+        return self._matrix_view
+
+    def _build_matrix(self, transform):
+        """Write the rotation, scale and translation into the top 3 rows of a 4x4 matrix."""
+        # The components may have been replaced with other arrays / sequences, the Numba kernel only accepts float32
+        # (no copy if they are already float32)
+        translate = np.asarray(self.translate, dtype=np.float32)
+        rotate = np.asarray(self.rotate, dtype=np.float32)
+        scale = np.asarray(self.scale, dtype=np.float32)
+        if self.quaternion is not None:
+            self._build_quaternion_matrix(transform, translate, scale)
+        elif _matrix_numba.NUMBA_AVAILABLE:
+            # Compiled closed form, avoids the temporary rotation matrices below
+            _matrix_numba.build_trs(translate, rotate, scale, transform)
+        else:
+            # Python floats and math functions, numpy's per-call overhead dominates on scalars
+            rx, ry, rz = rotate.tolist()
+            cx, cy, cz = math.cos(rx), math.cos(ry), math.cos(rz)
+            sx, sy, sz = math.sin(rx), math.sin(ry), math.sin(rz)
+            scale_x, scale_y, scale_z = scale.tolist()
+            tx, ty, tz = translate.tolist()
+
+            # Closed form of Rz @ Ry @ Rx, each column multiplied by its scale, with translation in the last column
+            transform[0] = (cz * cy * scale_x, (cz * sy * sx - sz * cx) * scale_y, (cz * sy * cx + sz * sx) * scale_z, tx)
+            transform[1] = (sz * cy * scale_x, (sz * sy * sx + cz * cx) * scale_y, (sz * sy * cx - cz * sx) * scale_z, ty)
+            transform[2] = (-sy * scale_x, cy * sx * scale_y, cy * cx * scale_z, tz)
+
+    def _build_quaternion_matrix(self, transform, translate, scale):
+        """Write the matrix from the quaternion, scale and translation (no sines / cosines needed)."""
+        w, x, y, z = self.quaternion
+        scale_x, scale_y, scale_z = scale.tolist()
+        tx, ty, tz = translate.tolist()
+        transform[0] = ((1 - 2 * (y * y + z * z)) * scale_x, 2 * (x * y - w * z) * scale_y, 2 * (x * z + w * y) * scale_z, tx)
+        transform[1] = (2 * (x * y + w * z) * scale_x, (1 - 2 * (x * x + z * z)) * scale_y, 2 * (y * z - w * x) * scale_z, ty)
+        transform[2] = (2 * (x * z - w * y) * scale_x, 2 * (y * z + w * x) * scale_y, (1 - 2 * (x * x + y * y)) * scale_z, tz)
+
+    @staticmethod
+    def euler_to_quaternion(rx, ry, rz):
+        """Convert XYZ Euler angles (applied as Rz * Ry * Rx, as transform_matrix()) to a unit quaternion.
+
+        Returns:
+            tuple: Quaternion (w, x, y, z)
+        """
+        cx, sx = math.cos(rx / 2), math.sin(rx / 2)
+        cy, sy = math.cos(ry / 2), math.sin(ry / 2)
+        cz, sz = math.cos(rz / 2), math.sin(rz / 2)
+        return (cz * cy * cx + sz * sy * sx,
+                cz * cy * sx - sz * sy * cx,
+                cz * sy * cx + sz * cy * sx,
+                sz * cy * cx - cz * sy * sx)
+
+    @staticmethod
+    def quaternion_to_euler(w, x, y, z):
+        """Convert a unit quaternion to XYZ Euler angles (applied as Rz * Ry * Rx), the inverse of euler_to_quaternion().
+
+        Returns:
+            tuple: Rotation angles (rx, ry, rz) in radians
+        """
+        rx = math.atan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y))
+        ry = math.asin(max(-1.0, min(1.0, 2 * (w * y - z * x))))
+        rz = math.atan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z))
+        return rx, ry, rz
+
+    def set_quaternion(self, w, x, y, z):
+        """Set the rotation as a quaternion (normalized here), used instead of the Euler angles in rotate.
+
+        rotate is updated to the equivalent Euler angles, so it still describes the rotation.
+        """
+        length = math.sqrt(w * w + x * x + y * y + z * z)
+        self.quaternion = (w / length, x / length, y / length, z / length)
+        self.rotate[:] = self.quaternion_to_euler(*self.quaternion)
+        self._mark_dirty()
+        return self
+
+    def _compose_quaternion(self, dw, dx, dy, dz):
+        """Rotate by a quaternion (applied after the current rotation), converting the Euler angles if not yet set."""
+        w, x, y, z = self.quaternion if self.quaternion is not None else self.euler_to_quaternion(*self.rotate.tolist())
+        # delta * quaternion (Hamilton product)
+        return self.set_quaternion(dw * w - dx * x - dy * y - dz * z,
+                                   dw * x + dx * w + dy * z - dz * y,
+                                   dw * y - dx * z + dy * w + dz * x,
+                                   dw * z + dx * y - dy * x + dz * w)
+
+    def rotate_about(self, axis, angle):
+        """Update rotation by an angle (in radians) about an axis, composed as quaternions.
+
+        The first call converts the Euler angles to a quaternion, after which the quaternion is used.
+
+        Args:
+            axis (tuple): Rotation axis (x, y, z), in the parent's coordinates
+            angle (float): Rotation angle in radians
+        """
+        ax, ay, az = (float(value) for value in axis)
+        length = math.sqrt(ax * ax + ay * ay + az * az)
+        half_sin = math.sin(angle / 2) / length
+        return self._compose_quaternion(math.cos(angle / 2), ax * half_sin, ay * half_sin, az * half_sin)
+
+    def set_parent(self, parent):
+        """Attach this transform to a parent transform, or detach it if parent is None.
+
+        Args:
+            parent (Transform): New parent transform, or None
+        """
+        ancestor = parent
+        while ancestor is not None:
+            if ancestor is self:
+                raise ValueError('A transform cannot be its own ancestor')
+            ancestor = ancestor.parent
+        if self.parent is not None:
+            self.parent.children.remove(self)
+        self.parent = parent
+        if parent is not None:
+            parent.children.append(self)
+        self._mark_world_dirty()
+        return self
+
+    def world_matrix(self):
+        """Create the 4x4 matrix of this transform combined with its parents (parent * ... * self).
+
+        Returns:
+            np.array: Read-only 4x4 transformation matrix. This is updated in place when the transform changes, copy it to keep it
+                (a new writable matrix if the transform is uncached)
+        """
+        if self.parent is None:
+            return self.transform_matrix()
+        if self.cached_matrix is None:
+            return self.parent.world_matrix() @ self.transform_matrix()
+        if self._world_needs_update:
+            np.matmul(self.parent.world_matrix(), self.transform_matrix(), out=self._world_matrix)
+            self._world_needs_update = False
+        return self._world_matrix_view
+
+    def _mark_world_dirty(self):
+        """Flag the world matrices of this transform and its descendants for recalculation."""
+        self._world_needs_update = True
+        for child in self.children:
+            child._mark_world_dirty()
+
+    def _mark_dirty(self, translate_only=False):
+        """Flag the matrix for recalculation after a change (only the translation, if translate_only)."""
+        if translate_only:
+            self.translate_needs_update = True
+        else:
+            self.needs_update = True
+        if self.children or self.parent is not None:
+            self._mark_world_dirty()
 
     def set_translate(self, x, y, z):
         """Set absolute translation values."""
-        self.translate = np.array([x, y, z], dtype=np.float32)
-        self.needs_update = True
+        translate = self.translate
+        translate[0] = x
+        translate[1] = y
+        translate[2] = z
+        self._mark_dirty(translate_only=True)
         return self
 
-    def translate(self, x, y, z):
+    def translate_by(self, x, y, z):
         """Update position by the given amounts."""
-        self.translate += np.array([x, y, z], dtype=np.float32)
-        self.needs_update = True
+        translate = self.translate
+        translate[0] += x
+        translate[1] += y
+        translate[2] += z
+        self._mark_dirty(translate_only=True)
         return self
     
     def set_rotate(self, rx, ry, rz):
-        """Set absolute rotation values."""
-        self.rotate = np.array([rx, ry, rz], dtype=np.float32)
-        self.needs_update = True
+        """Set absolute rotation values (replacing any quaternion)."""
+        self.quaternion = None
+        rotate = self.rotate
+        rotate[0] = rx
+        rotate[1] = ry
+        rotate[2] = rz
+        self._mark_dirty()
         return self
 
-    def rotate(self, rx, ry, rz):
-        """Update rotation by the given angles (in radians)."""
-        self.rotate += np.array([rx, ry, rz], dtype=np.float32)
-        self.needs_update = True
+    def rotate_by(self, rx, ry, rz):
+        """Update rotation by the given Euler angles (in radians).
+
+        While a quaternion is set, the rotation they describe is composed into the quaternion (applied after it).
+        """
+        if self.quaternion is not None:
+            return self._compose_quaternion(*self.euler_to_quaternion(rx, ry, rz))
+        rotate = self.rotate
+        rotate[0] += rx
+        rotate[1] += ry
+        rotate[2] += rz
+        self._mark_dirty()
         return self
 
     def set_scale(self, x, y, z):
         """Set absolute scale values."""
-        self.scale = np.array([x, y, z], dtype=np.float32)
-        self.needs_update = True
+        scale = self.scale
+        scale[0] = x
+        scale[1] = y
+        scale[2] = z
+        self._mark_dirty()
         return self
 
-    def scale(self, x, y, z):
+    def scale_by(self, x, y, z):
         """Scale relatively by multiplying current scale."""
-        self.scale *= np.array([x, y, z], dtype=np.float32)
-        self.needs_update = True
+        scale = self.scale
+        scale[0] *= x
+        scale[1] *= y
+        scale[2] *= z
+        self._mark_dirty()
         return self
+
+
+def world_matrices(transforms):
+    """Stack the world matrices (including any parents, see Transform.world_matrix()) of a list of transforms.
+
+    Args:
+        transforms (list[Transform]): Transforms
+
+    Returns:
+        np.ndarray: (N, 4, 4) float32 transformation matrices
+    """
+    matrices = np.empty((len(transforms), 4, 4), dtype=np.float32)
+    for i, transform in enumerate(transforms):
+        matrices[i] = transform.world_matrix()
+    return matrices
+
+
+def build_matrices(translates, rotates, scales, out=None):
+    """Batched equivalent of Transform.transform_matrix() for many transforms at once.
+
+    Large batches are built with JAX (on the GPU, if available) when it is installed.
+
+    Args:
+        translates (np.ndarray): (N, 3) translations
+        rotates (np.ndarray): (N, 3) XYZ rotation angles in radians
+        scales (np.ndarray): (N, 3) XYZ scale factors
+        out (np.ndarray, optional): (N, 4, 4) float32 array to write the matrices into
+
+    Returns:
+        np.ndarray: (N, 4, 4) float32 transformation matrices
+    """
+    translates = np.asarray(translates, dtype=np.float32)
+    rotates = np.asarray(rotates, dtype=np.float32)
+    scales = np.asarray(scales, dtype=np.float32)
+    if _matrix_jax.JAX_AVAILABLE and len(rotates) >= _matrix_jax.MIN_JAX_MATRICES:
+        matrices = _matrix_jax.build_matrices(translates, rotates, scales)
+        if out is None:
+            return np.array(matrices, dtype=np.float32)
+        out[:] = matrices
+        return out
+    if out is None:
+        out = np.empty((len(rotates), 4, 4), dtype=np.float32)
+    # One cos / sin call for all transforms
+    cx, cy, cz = np.cos(rotates).T
+    sx, sy, sz = np.sin(rotates).T
+    scale_x, scale_y, scale_z = scales.T
+    # Closed form of Rz @ Ry @ Rx, each column multiplied by its scale, as Transform.transform_matrix()
+    out[:, 0, 0], out[:, 0, 1], out[:, 0, 2] = cz * cy * scale_x, (cz * sy * sx - sz * cx) * scale_y, (cz * sy * cx + sz * sx) * scale_z
+    out[:, 1, 0], out[:, 1, 1], out[:, 1, 2] = sz * cy * scale_x, (sz * sy * sx + cz * cx) * scale_y, (sz * sy * cx - cz * sx) * scale_z
+    out[:, 2, 0], out[:, 2, 1], out[:, 2, 2] = -sy * scale_x, cy * sx * scale_y, cy * cx * scale_z
+    out[:, :3, 3] = translates
+    out[:, 3, :3] = 0
+    out[:, 3, 3] = 1
+    return out
+
+
+class TransformPool:
+    """Many transforms stored as (N, 3) translate / rotate / scale arrays, so their matrices are built in one batch.
+
+    Each transform in the pool is a Transform whose translate / rotate / scale are views of a row of the pool's
+    arrays, so it can be updated as normal (e.g. pool[i].set_translate(x, y, z)) or the arrays written directly.
+    The matrices can be passed straight to InstanceBuffer / BatchBuffer.set_transforms().
+    """
+    def __init__(self, count):
+        self.translates = np.zeros((count, 3), dtype=np.float32)
+        self.rotates = np.zeros((count, 3), dtype=np.float32)  # In radians
+        self.scales = np.ones((count, 3), dtype=np.float32)
+        self._matrices = np.empty((count, 4, 4), dtype=np.float32)
+        self.transforms = []
+        for i in range(count):
+            # Uncached, the pool builds the matrices
+            transform = Transform(cache=False)
+            transform.translate, transform.rotate, transform.scale = self.translates[i], self.rotates[i], self.scales[i]
+            self.transforms.append(transform)
+
+    def __len__(self):
+        return len(self.transforms)
+
+    def __getitem__(self, index):
+        return self.transforms[index]
+
+    def transform_matrices(self):
+        """Build the 4x4 matrices of all transforms in the pool.
+
+        Returns:
+            np.ndarray: (N, 4, 4) float32 transformation matrices. These are updated in place on the next call, copy them to keep them
+        """
+        return build_matrices(self.translates, self.rotates, self.scales, out=self._matrices)
@@ -13,6 +13,10 @@ setup(
     extras_require={
         'accelerated': [
             'glfw-accelerate',
+            'numba',
+        ],
+        'jax': [
+            'jax',
         ],
     },
     author="Max Peglar-Willis",
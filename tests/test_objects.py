@@ -0,0 +1,109 @@
+import numpy as np
+from OpenGL.GL import GL_ARRAY_BUFFER, GL_DYNAMIC_DRAW
+
+from pyglviewer.renderer import objects
+from pyglviewer.renderer.objects import Object
+from pyglviewer.renderer.shader import Shader
+from pyglviewer.utils.transform import Transform
+
+
+def test_set_translate_with_parent():
+    parent = Transform(translate=(1, 0, 0), rotate=(0, 0, 0.5), scale=(2, 2, 2))
+    obj = Object()
+    obj.set_transform(Transform(rotate=(0.3, 0, 0), scale=(1, 2, 3), parent=parent))
+    obj.set_translate((0, 2, 0))
+    np.testing.assert_allclose(obj._model_matrix, obj._transform.world_matrix().T, atol=1e-6)
+    np.testing.assert_allclose(obj._normal_matrix, Shader.normal_matrix(obj._transform.world_matrix().T), atol=1e-6)
+    # The translation is in the parent's space
+    np.testing.assert_allclose(obj._model_matrix[3, :3], (1 - 4 * np.sin(0.5), 4 * np.cos(0.5), 0), atol=1e-6)
+
+
+class FakeGL:
+    """Stands in for the GL calls made by persistently mapped buffers, each buffer's storage being a numpy array."""
+    
+    def __init__(self, monkeypatch):
+        self.storage, self.bound, self.fences = {}, {}, []
+        monkeypatch.setattr(objects, 'buffer_storage_supported', lambda: True)
+        monkeypatch.setattr(objects, 'glGenBuffers', lambda count: len(self.storage) + 1)
+        monkeypatch.setattr(objects, 'glBindBuffer', lambda target, buffer_id: self.bound.__setitem__(target, buffer_id))
+        monkeypatch.setattr(objects, 'glBufferStorage', lambda target, size, data, flags: self.storage.__setitem__(self.bound[target], np.zeros(size, dtype=np.uint8)))
+        monkeypatch.setattr(objects, 'glMapBufferRange', lambda target, offset, size, flags: self.storage[self.bound[target]].ctypes.data + offset)
+        monkeypatch.setattr(objects, 'glCopyBufferSubData', self.copy)
+        monkeypatch.setattr(objects, 'glFenceSync', lambda condition, flags: self.fences.append(object()) or self.fences[-1])
+        monkeypatch.setattr(objects, 'glClientWaitSync', lambda fence, flags, timeout: objects.GL_ALREADY_SIGNALED)
+        monkeypatch.setattr(objects, 'glDeleteSync', lambda fence: None)
+        monkeypatch.setattr(objects, 'glDeleteBuffers', lambda count, buffer_ids: None)
+    
+    def copy(self, read_target, write_target, read_offset, write_offset, size):
+        source, destination = self.storage[self.bound[read_target]], self.storage[self.bound[write_target]]
+        destination[write_offset:write_offset + size] = source[read_offset:read_offset + size]
+    
+    def region(self, buffer, region):
+        return self.storage[buffer.id][region * buffer.size:(region + 1) * buffer.size]
+
+
+def next_region(buffer):
+    """Finish drawing from the current region and bring the next one up to date, as render_buffer() does."""
+    buffer.fence()
+    buffer.prepare_region()
+
+
+def test_persistent_pending_writes_replayed_in_order(monkeypatch):
+    gl = FakeGL(monkeypatch)
+    buffer = objects.Buffer(None, GL_DYNAMIC_DRAW, GL_ARRAY_BUFFER, 16, persistent=True)
+    expected = np.zeros(16, dtype=np.uint8)
+    # Partially overlapping writes
+    for offset, value, size in ((0, 1, 8), (4, 2, 8), (2, 3, 4)):
+        buffer.update_data(np.full(size, value, dtype=np.uint8), offset)
+        expected[offset:offset + size] = value
+    np.testing.assert_array_equal(gl.region(buffer, 0), expected)
+    assert [len(pending) for pending in buffer._pending] == [0, 3, 3]
+    for region in (1, 2, 0):
+        next_region(buffer)
+        assert buffer.region == region
+        np.testing.assert_array_equal(gl.region(buffer, region), expected)
+    assert buffer._pending == [[], [], []]
+
+
+def test_persistent_covered_writes_dropped(monkeypatch):
+    gl = FakeGL(monkeypatch)
+    buffer = objects.Buffer(None, GL_DYNAMIC_DRAW, GL_ARRAY_BUFFER, 16, persistent=True)
+    buffer.update_data(np.full(4, 1, dtype=np.uint8), 4)
+    buffer.update_data(np.full(8, 2, dtype=np.uint8), 2)
+    buffer.update_data(np.full(8, 3, dtype=np.uint8), 2)
+    assert buffer._pending[1] == [(2, bytes([3] * 8))]
+    next_region(buffer)
+    np.testing.assert_array_equal(gl.region(buffer, 1), [0, 0] + [3] * 8 + [0] * 6)
+
+
+def test_persistent_unwritten_region_stays_in_sync(monkeypatch):
+    gl = FakeGL(monkeypatch)
+    data = np.arange(16, dtype=np.uint8)
+    buffer = objects.Buffer(data, GL_DYNAMIC_DRAW, GL_ARRAY_BUFFER, 16, persistent=True)
+    # Written in region 1 only, then drawn from every region several times without further writes
+    next_region(buffer)
+    buffer.update_data(np.full(4, 99, dtype=np.uint8), 8)
+    data[8:12] = 99
+    for _ in range(2 * objects.PERSISTENT_REGIONS):
+        next_region(buffer)
+        np.testing.assert_array_equal(gl.region(buffer, buffer.region), data)
+    for region in range(objects.PERSISTENT_REGIONS):
+        np.testing.assert_array_equal(gl.region(buffer, region), data)
+
+
+def test_persistent_copy_from_drops_copied_writes(monkeypatch):
+    gl = FakeGL(monkeypatch)
+    source = objects.Buffer(np.arange(8, dtype=np.uint8), GL_DYNAMIC_DRAW, GL_ARRAY_BUFFER, 8, persistent=True)
+    buffer = objects.Buffer(np.full(16, 7, dtype=np.uint8), GL_DYNAMIC_DRAW, GL_ARRAY_BUFFER, 16, persistent=True)
+    buffer.copy_from(source, 8)
+    # The earlier write isn't replayed over the copied data, only the part of it beyond the copy is kept
+    assert buffer._pending == [[], [(8, bytes([7] * 8))], [(8, bytes([7] * 8))]]
+    expected = np.concatenate([np.arange(8), np.full(8, 7)]).astype(np.uint8)
+    for region in range(objects.PERSISTENT_REGIONS):
+        buffer.prepare_region()
+        np.testing.assert_array_equal(gl.region(buffer, region), expected)
+        buffer.fence()
+    # Fully covered
+    buffer.update_data(np.full(4, 9, dtype=np.uint8), 2)
+    buffer.copy_from(source, 8)
+    assert buffer._pending == [[], [], []]
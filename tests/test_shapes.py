@@ -0,0 +1,57 @@
+import numpy as np
+
+from pyglviewer.renderer.shapes import ArrowDimensions, Shapes
+
+
+def per_arrow_shapes(p0s, p1s, dimensions, colours):
+    """Reference arrows, each built by Shapes._arrow()."""
+    return Shapes.combine([Shapes._arrow(p0, p1, dimensions, colour, (0, 0, 0), 8, True, True) for p0, p1, colour in zip(p0s, p1s, colours)])
+
+
+def assert_shapes_equal(shapes, expected):
+    assert len(shapes) == len(expected)
+    for shape, expected_shape in zip(shapes, expected):
+        assert shape.draw_type == expected_shape.draw_type
+        for name in ('positions', 'normals'):
+            assert np.isfinite(getattr(shape, name)).all()
+            np.testing.assert_allclose(getattr(shape, name), getattr(expected_shape, name), atol=1e-5)
+        np.testing.assert_array_equal(shape.indices, expected_shape.indices)
+
+
+def test_span_matrices_zero_length():
+    p0s = np.array([[1.0, 2.0, 3.0], [0.0, 0.0, 0.0]])
+    p1s = np.array([[1.0, 2.0, 3.0], [1.0, -2.0, 0.5]])
+    matrices = Shapes._span_matrices(p0s, p1s, (0.5, 0.25))
+    assert np.isfinite(matrices).all()
+    for matrix, p0, p1 in zip(matrices, p0s, p1s):
+        np.testing.assert_allclose(matrix, Shapes.calculate_transform(p0, p1, (0.5, 0.25)).transform_matrix(), atol=1e-6)
+
+
+def test_arrows_degenerate_match_arrow():
+    colours = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float32)
+    p0s = np.array([[0.0, 0.0, 0.0], [1.0, 1.0, 1.0], [0.0, 0.0, 0.0]])
+    p1s = np.array([[1.0, 0.0, 0.0], [1.0, 1.0, 1.0], [0.0, 2.0, 1.0]])
+    # Zero head length, and a zero length arrow (p0 == p1)
+    dimensions = ArrowDimensions(shaft_radius=0.05, head_radius=0.1, head_length=0.0)
+    shapes = Shapes.arrows(p0s, p1s, dimensions, colours, (0, 0, 0), segments=8)
+    assert_shapes_equal(shapes, per_arrow_shapes(p0s, p1s, dimensions, colours))
+
+
+def test_arrows_fallback_only_when_degenerate(monkeypatch):
+    calls = []
+    arrow = Shapes._arrow
+    monkeypatch.setattr(Shapes, '_arrow', staticmethod(lambda *args: calls.append(args) or arrow(*args)))
+    colours = np.array([[1, 0, 0], [0, 1, 0]], dtype=np.float32)
+    p0s, p1s = np.array([[0.0, 0.0, 0.0], [0.0, 0.0, 0.0]]), np.array([[1.0, 0.0, 0.0], [0.0, 2.0, 1.0]])
+    
+    dimensions = ArrowDimensions(shaft_radius=0.05, head_radius=0.1, head_length=0.2)
+    shapes = Shapes.arrows(p0s, p1s, dimensions, colours, (0, 0, 0), segments=8)
+    assert not calls
+    assert_shapes_equal(shapes, per_arrow_shapes(p0s, p1s, dimensions, colours))
+    
+    # Head as long as the first arrow, so its shaft has zero length
+    dimensions = ArrowDimensions(shaft_radius=0.05, head_radius=0.1, head_length=1.0)
+    calls.clear()
+    shapes = Shapes.arrows(p0s, p1s, dimensions, colours, (0, 0, 0), segments=8)
+    assert len(calls) == 2
+    assert_shapes_equal(shapes, per_arrow_shapes(p0s, p1s, dimensions, colours))
@@ -0,0 +1,24 @@
+import math
+
+from pyglviewer.utils.timer import Timer
+
+
+def test_oscillator_follows_time():
+    timer = Timer()
+    oscillator = timer.register_oscillator(speed=2, samples=1024)
+    timer.update()
+    assert abs(oscillator() - math.sin(2 * math.pi * 2 * timer.time)) < 0.02
+
+
+def test_unregister_oscillator():
+    timer = Timer()
+    kept = timer.register_oscillator(speed=1)
+    removed = timer.register_oscillator(speed=0.5)
+    timer.unregister_oscillator(removed)
+    assert list(timer._oscillators) == [kept]
+    # No longer updated
+    value = removed()
+    timer.update()
+    assert removed() == value
+    # Unregistering twice is harmless
+    timer.unregister_oscillator(removed)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from pyglviewer.utils import _matrix_numba
+from pyglviewer.utils.transform import Transform, world_matrices
+
+
+def numpy_matrix(translate, rotate, scale):
+    """Reference translate * Rz * Ry * Rx * scale matrix."""
+    cx, cy, cz = np.cos(rotate)
+    sx, sy, sz = np.sin(rotate)
+    rx = np.array([[1, 0, 0], [0, cx, -sx], [0, sx, cx]])
+    ry = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+    rz = np.array([[cz, -sz, 0], [sz, cz, 0], [0, 0, 1]])
+    matrix = np.identity(4)
+    matrix[:3, :3] = rz @ ry @ rx @ np.diag(scale)
+    matrix[:3, 3] = translate
+    return matrix
+
+
+@pytest.mark.parametrize('numba', [True, False])
+def test_transform_matrix_float64_components(monkeypatch, numba):
+    if numba and not _matrix_numba.NUMBA_AVAILABLE:
+        pytest.skip('numba is not installed')
+    monkeypatch.setattr(_matrix_numba, 'NUMBA_AVAILABLE', numba)
+    translate, rotate, scale = (1.0, 2.0, 3.0), (0.3, -0.7, 1.1), (2.0, 3.0, 4.0)
+    transform = Transform()
+    # Replaced with float64 arrays / lists, rather than set through the setters
+    transform.translate = np.array(translate, dtype=np.float64)
+    transform.rotate = np.array(rotate, dtype=np.float64)
+    transform.scale = list(scale)
+    transform.needs_update = True
+    np.testing.assert_allclose(transform.transform_matrix(), numpy_matrix(translate, rotate, scale), atol=1e-5)
+
+
+def test_world_matrices_include_parents():
+    parent = Transform(translate=(1, 0, 0), rotate=(0, 0, 0.5))
+    child = Transform(translate=(0, 2, 0), scale=(2, 2, 2), parent=parent)
+    matrices = world_matrices([parent, child])
+    assert matrices.shape == (2, 4, 4) and matrices.dtype == np.float32
+    np.testing.assert_allclose(matrices[0], numpy_matrix((1, 0, 0), (0, 0, 0.5), (1, 1, 1)), atol=1e-6)
+    np.testing.assert_allclose(matrices[1], numpy_matrix((1, 0, 0), (0, 0, 0.5), (1, 1, 1)) @ numpy_matrix((0, 2, 0), (0, 0, 0), (2, 2, 2)), atol=1e-6)
+    # Moving the parent moves the child
+    parent.set_translate(5, 0, 0)
+    np.testing.assert_allclose(world_matrices([child])[0][:3, 3], matrices[1][:3, 3] + (4, 0, 0), atol=1e-6)
+
+
+def test_euler_rotation_after_quaternion():
+    transform = Transform(translate=(1, 2, 3))
+    transform.rotate_about((0, 0, 1), 0.5)
+    # rotate describes the quaternion's rotation
+    np.testing.assert_allclose(transform.rotate, (0, 0, 0.5), atol=1e-6)
+    # Euler rotations are composed into the quaternion, rather than ignored
+    transform.rotate_by(0, 0, 0.25)
+    np.testing.assert_allclose(transform.transform_matrix(), numpy_matrix((1, 2, 3), (0, 0, 0.75), (1, 1, 1)), atol=1e-6)
+    np.testing.assert_allclose(transform.rotate, (0, 0, 0.75), atol=1e-6)
+    transform.rotate_by(0.3, 0, 0)
+    expected = numpy_matrix((0, 0, 0), (0.3, 0, 0), (1, 1, 1)) @ numpy_matrix((0, 0, 0), (0, 0, 0.75), (1, 1, 1))
+    np.testing.assert_allclose(transform.transform_matrix()[:3, :3], expected[:3, :3], atol=1e-6)
+    np.testing.assert_allclose(numpy_matrix((0, 0, 0), transform.rotate, (1, 1, 1))[:3, :3], expected[:3, :3], atol=1e-6)
+    # Setting Euler angles replaces the quaternion
+    transform.set_rotate(0.1, 0.2, 0.3)
+    assert transform.quaternion is None
+    np.testing.assert_allclose(transform.transform_matrix(), numpy_matrix((1, 2, 3), (0.1, 0.2, 0.3), (1, 1, 1)), atol=1e-6)